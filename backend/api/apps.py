@@ -1,5 +1,4 @@
 from django.apps import AppConfig
-from .firebase import initialize_firebase
 
 
 class ApiConfig(AppConfig):
@@ -7,4 +6,4 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        initialize_firebase()
+        import api.signals  # noqa
@@ -0,0 +1,259 @@
+"""
+Асинхронные варианты эндпоинтов чтения для запуска под ASGI (uvicorn).
+
+Данные загружаются асинхронным ORM (aget, async for) вместе со всеми
+связями, поэтому сериализаторы DRF работают с готовыми объектами
+и не обращаются к БД из потока событий. Ожидание БД и кэша не занимает
+воркер: пока один запрос ждет ответа, обрабатываются другие.
+Формат ответов совпадает с синхронными эндпоинтами, кроме каталога
+заданий: курсор только вперед, previous всегда null.
+"""
+import base64
+import binascii
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.http import JsonResponse
+from django_filters.utils import translate_validation
+from rest_framework import status
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from challenge_engine.catalog import aget_catalog_version
+from challenge_engine.models import CategoryTasks, Task, UsersTasks
+from user_service.models import Skill
+from .authentication import CachedJWTAuthentication
+from .caching import aget_or_build_many, catalog_key
+from .filters import TaskFilter
+from .serializers import (
+    CategoryTasksSerializer, SlifeUserSerializer, TaskBriefSerializer,
+    TaskFullSerializer, UsersTasksListSerializer
+)
+
+User = get_user_model()
+
+PAGE_SIZE = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+# Константы для сообщений об ошибках
+NOT_AUTHENTICATED = 'Учетные данные не были предоставлены.'
+METHOD_NOT_ALLOWED = 'Метод не разрешен.'
+NOT_FOUND = 'Страница не найдена.'
+INVALID_PAGE = 'Неправильная страница.'
+INVALID_CURSOR = 'Неверный курсор.'
+
+authenticator = CachedJWTAuthentication()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(
+        data, status=status_code, safe=False,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def async_api_view(view):
+    """
+    GET-обработчик с JWT-аутентификацией CachedJWTAuthentication.
+    Аутентификация выполняется в потоке: при промахе кэша
+    пользователь читается синхронным ORM.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response(
+                {'detail': METHOD_NOT_ALLOWED},
+                status.HTTP_405_METHOD_NOT_ALLOWED
+            )
+        try:
+            authenticated = await sync_to_async(
+                authenticator.authenticate
+            )(request)
+        except AuthenticationFailed as error:
+            return json_response(
+                {'detail': error.detail}, status.HTTP_401_UNAUTHORIZED
+            )
+        if authenticated is None:
+            return json_response(
+                {'detail': NOT_AUTHENTICATED}, status.HTTP_401_UNAUTHORIZED
+            )
+        request.user, request.auth = authenticated
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class PaginationError(Exception):
+    pass
+
+
+async def paginate(request, queryset):
+    """Страница в формате PageNumberPagination: count, next, previous"""
+    page = request.GET.get('page', '1')
+    if not page.isdigit() or int(page) < 1:
+        raise PaginationError(INVALID_PAGE)
+    page = int(page)
+    count = await queryset.acount()
+    offset = (page - 1) * PAGE_SIZE
+    if offset and offset >= count:
+        raise PaginationError(INVALID_PAGE)
+    url = request.build_absolute_uri()
+    return {
+        'count': count,
+        'next': (
+            replace_query_param(url, 'page', page + 1)
+            if offset + PAGE_SIZE < count else None
+        ),
+        'previous': (
+            None if page == 1 else
+            remove_query_param(url, 'page') if page == 2 else
+            replace_query_param(url, 'page', page - 1)
+        ),
+        'results': [obj async for obj in queryset[offset:offset + PAGE_SIZE]],
+    }
+
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(
+        f'{row["created_at"].isoformat()}|{row["id"]}'.encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, task_id = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise PaginationError(INVALID_CURSOR)
+
+
+async def cached_tasks(ids, serializer_class):
+    """Карточки заданий из общего с TaskViewSet кэша каталога"""
+    version = await aget_catalog_version()
+
+    async def build(missing_ids):
+        tasks = [
+            task async for task in
+            Task.objects.filter(id__in=missing_ids).with_rewards()
+        ]
+        return {
+            data['id']: data
+            for data in serializer_class(tasks, many=True).data
+        }
+
+    payloads = await aget_or_build_many(
+        {
+            catalog_key(version, serializer_class.__name__, task_id): task_id
+            for task_id in ids
+        },
+        build
+    )
+    return [payloads[task_id] for task_id in ids]
+
+
+@async_api_view
+async def task_list(request):
+    """
+    Доступные задания с keyset-пагинацией по (created_at, id)
+    через индекс task_created_at_id_idx
+    """
+    filterset = TaskFilter(
+        request.GET, queryset=Task.objects.available_for(request.user)
+    )
+    # Как DjangoFilterBackend: неверный фильтр - ошибка, а не пустой фильтр
+    if not await sync_to_async(filterset.is_valid)():
+        return json_response(
+            translate_validation(filterset.errors).detail,
+            status.HTTP_400_BAD_REQUEST
+        )
+    queryset = filterset.qs
+    cursor = request.GET.get('cursor')
+    try:
+        if cursor:
+            created_at, task_id = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, id__lt=task_id)
+            )
+    except PaginationError as error:
+        return json_response({'detail': str(error)}, status.HTTP_404_NOT_FOUND)
+    rows = [
+        row async for row in queryset.order_by(
+            '-created_at', '-id'
+        ).values('id', 'created_at')[:PAGE_SIZE + 1]
+    ]
+    page = rows[:PAGE_SIZE]
+    return json_response({
+        'next': replace_query_param(
+            request.build_absolute_uri(), 'cursor', encode_cursor(page[-1])
+        ) if len(rows) > PAGE_SIZE else None,
+        'previous': None,
+        'results': await cached_tasks(
+            [row['id'] for row in page], TaskBriefSerializer
+        ),
+    })
+
+
+@async_api_view
+async def task_detail(request, pk):
+    if not await Task.objects.available_for(request.user).filter(
+        pk=pk
+    ).aexists():
+        return json_response({'detail': NOT_FOUND}, status.HTTP_404_NOT_FOUND)
+    return json_response((await cached_tasks([pk], TaskFullSerializer))[0])
+
+
+@async_api_view
+async def category_list(request):
+    version = await aget_catalog_version()
+    # Ключ строится только из номера страницы, см. CategoryTasksViewSet
+    number = request.GET.get('page', '1')
+
+    async def build(_):
+        page = await paginate(request, CategoryTasks.objects.all())
+        page['results'] = CategoryTasksSerializer(
+            page['results'], many=True
+        ).data
+        return {number: page}
+
+    try:
+        if not number.isdigit():
+            raise PaginationError(INVALID_PAGE)
+        payloads = await aget_or_build_many(
+            {catalog_key(version, 'async-categories', number): number}, build
+        )
+    except PaginationError as error:
+        return json_response({'detail': str(error)}, status.HTTP_404_NOT_FOUND)
+    return json_response(payloads[number])
+
+
+@async_api_view
+async def user_task_list(request):
+    queryset = UsersTasks.objects.all()
+    if not request.user.is_staff:
+        queryset = queryset.filter(initiator=request.user)
+    try:
+        page = await paginate(request, queryset.with_task_details())
+    except PaginationError as error:
+        return json_response({'detail': str(error)}, status.HTTP_404_NOT_FOUND)
+    page['results'] = UsersTasksListSerializer(
+        page['results'], many=True
+    ).data
+    return json_response(page)
+
+
+@async_api_view
+async def user_me(request):
+    user = await User.objects.with_profile_stats(request.user).aget(
+        pk=request.user.pk
+    )
+    # Список навыков для get_skills загружается здесь, а не в сериализаторе
+    return json_response(SlifeUserSerializer(user, context={
+        'request': request,
+        'all_skills': [skill async for skill in Skill.objects.all()],
+    }).data)
@@ -0,0 +1,96 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Двухуровневый кэш пользователей по id: LRU в памяти процесса
+    и общий кэш Django. Локальная запись живет AUTH_USER_CACHE_LOCAL_TTL
+    секунд, поэтому инвалидация из другого процесса доходит до него
+    не позже этого срока.
+    """
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id):
+        return f'auth-user:{user_id}'
+
+    def get(self, user_id):
+        # В токене id хранится строкой, в модели — числом
+        user_id = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at > now:
+                    self._local.move_to_end(user_id)
+                    return copy.copy(user)
+                del self._local[user_id]
+        user = cache.get(self._key(user_id))
+        if user is not None:
+            self._remember(user_id, user)
+            return copy.copy(user)
+        return None
+
+    def set(self, user):
+        cache.set(self._key(user.pk), user, settings.AUTH_USER_CACHE_TTL)
+        self._remember(str(user.pk), user)
+
+    def delete(self, user_id):
+        user_id = str(user_id)
+        cache.delete(self._key(user_id))
+        with self._lock:
+            self._local.pop(user_id, None)
+
+    def _remember(self, user_id, user):
+        expires_at = time.monotonic() + settings.AUTH_USER_CACHE_LOCAL_TTL
+        with self._lock:
+            self._local[user_id] = (expires_at, copy.copy(user))
+            self._local.move_to_end(user_id)
+            while len(self._local) > settings.AUTH_USER_CACHE_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без SELECT пользователя на каждый запрос:
+    пользователь берется из user_cache, при промахе — из базы.
+    Кэш сбрасывается при сохранении и удалении пользователя
+    (смена пароля, деактивация) в api/signals.py.
+    """
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code='password_changed'
+            )
+        return user
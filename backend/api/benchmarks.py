@@ -0,0 +1,76 @@
+"""Вспомогательные функции для команд bench_*"""
+import statistics
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+
+@contextmanager
+def rollback_after():
+    """Выполняет блок в транзакции и откатывает ее, не оставляя данных"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(func, repeat=50, warmup=3):
+    """
+    Вызывает func repeat раз и возвращает задержки в миллисекундах
+    (p50, p95, среднее), число SQL-запросов на вызов
+    и пропускную способность при последовательных вызовах.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = perf_counter()
+            func()
+            timings.append((perf_counter() - start) * 1000)
+        queries = len(context)
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': queries,
+        'runs': repeat,
+        'rps': round(repeat / sum(timings) * 1000, 1),
+    }
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга"""
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def format_result(name, result):
+    return (
+        f'{name:<40} p50={result["p50_ms"]:>9.3f} ms '
+        f'p95={result["p95_ms"]:>9.3f} ms queries={result["queries"]}'
+        f' rps={result["rps"]}'
+    )
+
+
+def get_bench_user(email=None):
+    """Пользователь для замера: по email или самый популярный"""
+    if email:
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f'Пользователь {email} не найден')
+        return user
+    user = User.objects.order_by('-authors_count', 'pk').first()
+    if user is None:
+        raise CommandError(
+            'В БД нет пользователей: запустите seed_data '
+            'или укажите --seed-users'
+        )
+    return user
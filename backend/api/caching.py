@@ -0,0 +1,109 @@
+"""Кэширование ответов каталога с версионными ключами и ETag"""
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+# Сколько ждать, пока другой процесс перестраивает те же записи
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT = 2.0
+REBUILD_POLL_INTERVAL = 0.05
+
+
+def catalog_key(version, *parts):
+    return ':'.join(('catalog', str(version), *map(str, parts)))
+
+
+def get_or_build_many(keys, build):
+    """
+    Возвращает значения по ключам кэша, перестраивая отсутствующие.
+
+    keys — словарь {ключ кэша: идентификатор}, build получает список
+    идентификаторов без значения и возвращает {идентификатор: значение}.
+    Защита от лавины запросов после смены версии: перестраивает только
+    процесс, захвативший блокировку на набор ключей, остальные ждут
+    его результат до REBUILD_WAIT секунд.
+    """
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if not missing:
+        return {keys[key]: value for key, value in found.items()}
+
+    lock_key = 'lock:' + hashlib.md5(
+        ''.join(sorted(missing)).encode()
+    ).hexdigest()
+    locked = cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT)
+    if not locked:
+        deadline = time.monotonic() + REBUILD_WAIT
+        while missing and time.monotonic() < deadline:
+            time.sleep(REBUILD_POLL_INTERVAL)
+            found.update(cache.get_many(missing))
+            missing = [key for key in missing if key not in found]
+    try:
+        if missing:
+            built = build([keys[key] for key in missing])
+            fresh = {key: built[keys[key]] for key in missing}
+            cache.set_many(fresh, settings.CATALOG_CACHE_TIMEOUT)
+            found.update(fresh)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return {keys[key]: value for key, value in found.items()}
+
+
+async def aget_or_build_many(keys, build):
+    """
+    Асинхронный вариант get_or_build_many для api.async_views:
+    ожидание чужой перестройки не блокирует поток событий,
+    build — корутина.
+    """
+    found = await cache.aget_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if not missing:
+        return {keys[key]: value for key, value in found.items()}
+
+    lock_key = 'lock:' + hashlib.md5(
+        ''.join(sorted(missing)).encode()
+    ).hexdigest()
+    locked = await cache.aadd(lock_key, 1, REBUILD_LOCK_TIMEOUT)
+    if not locked:
+        deadline = time.monotonic() + REBUILD_WAIT
+        while missing and time.monotonic() < deadline:
+            await asyncio.sleep(REBUILD_POLL_INTERVAL)
+            found.update(await cache.aget_many(missing))
+            missing = [key for key in missing if key not in found]
+    try:
+        if missing:
+            built = await build([keys[key] for key in missing])
+            fresh = {key: built[keys[key]] for key in missing}
+            await cache.aset_many(fresh, settings.CATALOG_CACHE_TIMEOUT)
+            found.update(fresh)
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def get_or_build(key, build):
+    return get_or_build_many({key: key}, lambda _: {key: build()})[key]
+
+
+def make_etag(*parts):
+    return '"{}"'.format(
+        hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    )
+
+
+def conditional_response(request, etag, build_response):
+    """Отвечает 304, если клиент прислал актуальный If-None-Match"""
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in (tag.strip() for tag in if_none_match.split(',')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build_response()
+    response['ETag'] = etag
+    return response
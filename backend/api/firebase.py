@@ -1,13 +1,46 @@
-import firebase_admin
-from firebase_admin import credentials
+import logging
+import os
+import threading
+
 from django.conf import settings
 
-def initialize_firebase():
+logger = logging.getLogger(__name__)
+
+_app = None
+_lock = threading.Lock()
+
+
+def get_firebase_app():
+    """
+    Лениво инициализирует Firebase Admin SDK при первом использовании.
+    firebase_admin импортируется только здесь, поэтому migrate, shell,
+    тесты и старт воркеров не тратят время на SDK и файл ключа.
+    Возвращает None, если файл учетных данных не найден.
+    """
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                _app = _initialize_firebase() or False
+    return _app or None
+
+
+def _initialize_firebase():
     """Инициализирует Firebase Admin SDK"""
+    if not os.path.exists(settings.FIREBASE_CREDENTIALS_PATH):
+        logger.warning(
+            'Файл учетных данных Firebase не найден: %s',
+            settings.FIREBASE_CREDENTIALS_PATH
+        )
+        return None
+
+    import firebase_admin
+    from firebase_admin import credentials
+
     try:
         # Проверяем, не инициализирован ли уже SDK
-        firebase_admin.get_app()
+        return firebase_admin.get_app()
     except ValueError:
         # Если нет, инициализируем
         cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred) 
\ No newline at end of file
+        return firebase_admin.initialize_app(cred)
@@ -0,0 +1,193 @@
+import json
+import platform
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarks import (
+    format_result, get_bench_user, measure, rollback_after
+)
+from api.seeding import Seeder, SeedVolumes
+from challenge_engine.models import CategoryTasks, Task, UsersTasks
+from user_service.models import Skill
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер эндпоинтов /api/: p50/p95, запросы к БД '
+        'и пропускная способность. Результат можно сохранить в JSON '
+        'и сравнить с предыдущим запуском.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--seed-users', type=int, default=0,
+            help='Создать данные на указанное число пользователей '
+                 'в транзакции и откатить их после замера'
+        )
+        parser.add_argument(
+            '--user', help='Email пользователя, от имени которого идут '
+                           'запросы; по умолчанию самый активный'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Адрес запущенного сервера, например http://127.0.0.1:8000;'
+                 ' без него запросы идут через тестовый клиент'
+        )
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+        parser.add_argument(
+            '--compare', help='JSON предыдущего запуска для сравнения'
+        )
+
+    def handle(self, *args, seed_users, output, compare, **options):
+        if seed_users:
+            if options['base_url']:
+                raise CommandError(
+                    '--seed-users нельзя сочетать с --base-url: '
+                    'сервер не увидит неподтвержденную транзакцию'
+                )
+            with rollback_after():
+                Seeder(SeedVolumes(
+                    users=seed_users, tasks=max(seed_users // 2, 1)
+                )).seed()
+                results = self.run(**options)
+        else:
+            results = self.run(**options)
+
+        if output:
+            with open(output, 'w') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+        if compare:
+            with open(compare) as file:
+                self.compare(json.load(file), results)
+
+    def run(self, repeat, warmup, user, base_url, **options):
+        user = get_bench_user(user)
+        request = (
+            self.server_request(base_url, user) if base_url
+            else self.client_request(user)
+        )
+        scenarios = {}
+        for name, path in self.scenarios(user):
+            result = measure(lambda: request(path), repeat, warmup)
+            if base_url:
+                # Запросы выполняет другой процесс
+                result['queries'] = None
+            scenarios[name] = {'path': path, **result}
+            self.stdout.write(format_result(name, result))
+        return {
+            'created_at': timezone.now().isoformat(),
+            'mode': 'server' if base_url else 'client',
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'rows': {
+                model._meta.label: model.objects.count()
+                for model in (User, Task, UsersTasks)
+            },
+            'scenarios': scenarios,
+        }
+
+    def scenarios(self, user):
+        """Эндпоинты с идентификаторами из текущих данных"""
+        scenarios = [
+            ('GET /api/users/me/', '/api/users/me/'),
+            ('GET /api/users/<id>/', f'/api/users/{user.pk}/'),
+            ('GET /api/users/subscriptions/', '/api/users/subscriptions/'),
+            ('GET /api/users/subscribers/', '/api/users/subscribers/'),
+            ('GET /api/user-skills/', '/api/user-skills/'),
+            ('GET /api/tasks/', '/api/tasks/'),
+            ('GET /api/categories/', '/api/categories/'),
+            ('GET /api/user-tasks/', '/api/user-tasks/'),
+        ]
+        category = CategoryTasks.objects.filter(tasks__isnull=False).first()
+        if category:
+            scenarios.append((
+                'GET /api/tasks/?category=',
+                f'/api/tasks/?category={category.slug}'
+            ))
+        task = Task.objects.available_for(user).first()
+        if task:
+            scenarios.append(('GET /api/tasks/<id>/', f'/api/tasks/{task.pk}/'))
+        user_task = UsersTasks.objects.filter(initiator=user).first()
+        if user_task:
+            scenarios.append((
+                'GET /api/user-tasks/<id>/',
+                f'/api/user-tasks/{user_task.pk}/'
+            ))
+        skill = Skill.objects.first()
+        if skill:
+            scenarios += [
+                ('GET /api/leaderboards/<id>/', f'/api/leaderboards/{skill.pk}/'),
+                (
+                    'GET /api/leaderboards/<id>/around-me/',
+                    f'/api/leaderboards/{skill.pk}/around-me/'
+                ),
+            ]
+        return scenarios
+
+    def client_request(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        # Тестовый клиент обращается к хосту testserver
+        allowed_hosts = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        )
+
+        def request(path):
+            with allowed_hosts:
+                response = client.get(path)
+            if response.status_code >= 400:
+                raise CommandError(f'{path}: HTTP {response.status_code}')
+
+        return request
+
+    def server_request(self, base_url, user):
+        headers = {'Authorization': (
+            f'{api_settings.AUTH_HEADER_TYPES[0]} {AccessToken.for_user(user)}'
+        )}
+
+        def request(path):
+            try:
+                with urlopen(Request(base_url.rstrip('/') + path,
+                                     headers=headers)) as response:
+                    response.read()
+            except HTTPError as error:
+                raise CommandError(f'{path}: HTTP {error.code}')
+
+        return request
+
+    def compare(self, previous, current):
+        self.stdout.write(f'\nСравнение с запуском {previous["created_at"]}:')
+        for name, result in current['scenarios'].items():
+            before = previous['scenarios'].get(name)
+            if before is None:
+                continue
+            self.stdout.write(
+                f'{name:<40} ' + ' '.join(
+                    f'{key}={change(before[key], result[key])}'
+                    for key in ('p50_ms', 'p95_ms', 'queries')
+                )
+            )
+
+
+def change(before, after):
+    if before is None or after is None:
+        return '-'
+    if not before:
+        return f'{after}'
+    return f'{(after - before) / before * 100:+.1f}%'
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import statistics
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarks import get_bench_user, percentile
+from challenge_engine.models import Task
+
+# Пары (синхронный путь, асинхронный вариант)
+SCENARIOS = (
+    ('/api/tasks/', '/api/async/tasks/'),
+    ('/api/tasks/{task_id}/', '/api/async/tasks/{task_id}/'),
+    ('/api/categories/', '/api/async/categories/'),
+    ('/api/user-tasks/', '/api/async/user-tasks/'),
+    ('/api/users/me/', '/api/async/users/me/'),
+)
+
+
+class HTTPConnection:
+    """
+    Минимальный HTTP/1.1-клиент с keep-alive поверх asyncio streams:
+    без сторонних зависимостей и без накладных расходов, которые
+    исказили бы сравнение серверов.
+    """
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = ''.join(
+            f'{name}: {value}\r\n' for name, value in headers.items()
+        )
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        self.writer.write((
+            f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n{self.headers}\r\n'
+        ).encode())
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Сервер закрыл соединение')
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding') == 'chunked':
+            while size := int((await self.reader.readline()).strip(), 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def run_load(base_url, path, headers, concurrency, duration):
+    """concurrency клиентов в цикле запрашивают path в течение duration"""
+    url = urlsplit(base_url)
+    timings = []
+    errors = 0
+    deadline = perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        connection = HTTPConnection(url.hostname, url.port or 80, headers)
+        while perf_counter() < deadline:
+            start = perf_counter()
+            try:
+                status = await connection.get(path)
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                connection.close()
+                status = None
+            if status == 200:
+                timings.append((perf_counter() - start) * 1000)
+            else:
+                errors += 1
+        connection.close()
+
+    start = perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = perf_counter() - start
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+        'requests': len(timings),
+        'errors': errors,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность синхронных эндпоинтов чтения '
+        'под WSGI и их асинхронных вариантов /api/async/ под ASGI при '
+        'большом числе одновременных клиентов. Оба сервера запускаются '
+        'отдельно на одной БД, например: gunicorn slife.wsgi -w 4 '
+        '-b :8000 и uvicorn slife.asgi:application --workers 4 --port 8001.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wsgi-url', default='http://127.0.0.1:8000',
+            help='Адрес WSGI-сервера'
+        )
+        parser.add_argument(
+            '--asgi-url', default='http://127.0.0.1:8001',
+            help='Адрес ASGI-сервера'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=200,
+            help='Количество одновременных клиентов'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность замера каждого сценария, секунды'
+        )
+        parser.add_argument(
+            '--user', help='Email пользователя, от имени которого идут '
+                           'запросы; по умолчанию самый активный'
+        )
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, wsgi_url, asgi_url, concurrency, duration, user,
+               output, **options):
+        if urlsplit(wsgi_url).scheme != 'http' or (
+            urlsplit(asgi_url).scheme != 'http'
+        ):
+            raise CommandError('Поддерживаются только адреса http://')
+        user = get_bench_user(user)
+        headers = {'Authorization': (
+            f'{api_settings.AUTH_HEADER_TYPES[0]} {AccessToken.for_user(user)}'
+        )}
+        task = Task.objects.available_for(user).first()
+        scenarios = {}
+        for sync_path, async_path in SCENARIOS:
+            if '{task_id}' in sync_path:
+                if task is None:
+                    continue
+                sync_path = sync_path.format(task_id=task.pk)
+                async_path = async_path.format(task_id=task.pk)
+            wsgi = asyncio.run(run_load(
+                wsgi_url, sync_path, headers, concurrency, duration
+            ))
+            asgi = asyncio.run(run_load(
+                asgi_url, async_path, headers, concurrency, duration
+            ))
+            scenarios[sync_path] = {'wsgi': wsgi, 'asgi': asgi}
+            for mode, result in (('WSGI', wsgi), ('ASGI', asgi)):
+                self.stdout.write(
+                    f'{mode} {sync_path:<36} rps={result["rps"]:>8} '
+                    f'p50={result["p50_ms"]} ms p95={result["p95_ms"]} ms '
+                    f'errors={result["errors"]}'
+                )
+        if output:
+            with open(output, 'w') as file:
+                json.dump({
+                    'created_at': timezone.now().isoformat(),
+                    'concurrency': concurrency,
+                    'duration': duration,
+                    'scenarios': scenarios,
+                }, file, indent=2, ensure_ascii=False)
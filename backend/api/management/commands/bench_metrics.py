@@ -0,0 +1,71 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarks import format_result, measure, rollback_after
+from api.metrics import is_multiprocess, record_request, render_metrics
+
+User = get_user_model()
+
+METRICS_MIDDLEWARE = 'api.middleware.RequestMetricsMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет стоимость записи метрик запроса и выдачи /api/metrics/. '
+        'Для замера многопроцессного режима запустите с '
+        'PROMETHEUS_MULTIPROC_DIR.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--calls', type=int, default=100000,
+            help='Количество вызовов record_request'
+        )
+        parser.add_argument(
+            '--routes', type=int, default=50,
+            help='Количество различных маршрутов в метках'
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, calls, routes, repeat, **options):
+        self.stdout.write(
+            'Режим: ' + ('multiprocess' if is_multiprocess() else 'in-process')
+        )
+        labels = [(f'bench-route-{i % routes}', 'GET', 200)
+                  for i in range(calls)]
+        start = perf_counter()
+        for route, method, status in labels:
+            record_request(route, method, status, 0.01)
+        elapsed = perf_counter() - start
+        self.stdout.write(
+            f'{"record_request":<40} {elapsed / calls * 1e9:>9.0f} ns/вызов'
+        )
+
+        self.stdout.write(format_result(
+            'render_metrics', measure(render_metrics, repeat)
+        ))
+
+        with rollback_after():
+            user = User.objects.create_user('bench-metrics@slife.local')
+            hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+            without_metrics = [
+                middleware for middleware in settings.MIDDLEWARE
+                if middleware != METRICS_MIDDLEWARE
+            ]
+            for name, middleware in (
+                ('GET /api/categories/ без метрик', without_metrics),
+                ('GET /api/categories/ с метриками', settings.MIDDLEWARE),
+            ):
+                with override_settings(
+                    ALLOWED_HOSTS=hosts, MIDDLEWARE=middleware
+                ):
+                    client = APIClient()
+                    client.force_authenticate(user)
+                    self.stdout.write(format_result(name, measure(
+                        lambda: client.get('/api/categories/'), repeat
+                    )))
@@ -0,0 +1,95 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import percentile
+
+WSGI_COLD_START = 'from slife.wsgi import application'
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет холодный старт WSGI-приложения и manage.py check '
+        'в отдельных процессах, как python -X importtime'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--top', type=int, default=15,
+            help='Сколько самых дорогих импортов показать'
+        )
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, repeat, top, output, **options):
+        results = {
+            'wsgi_cold_start': self.run(
+                [sys.executable, '-X', 'importtime', '-c', WSGI_COLD_START],
+                repeat, top
+            ),
+            'manage_check': self.run(
+                [sys.executable, '-X', 'importtime', 'manage.py', 'check'],
+                repeat, top
+            ),
+        }
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20} p50={result["p50_ms"]:>9.1f} ms '
+                f'p95={result["p95_ms"]:>9.1f} ms'
+            )
+            for module, cumulative_us in result['top_imports']:
+                self.stdout.write(
+                    f'    {cumulative_us / 1000:>9.1f} ms  {module}'
+                )
+        if output:
+            with open(output, 'w') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+
+    def run(self, command, repeat, top):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'slife.settings'
+            ),
+            'PYTHONDONTWRITEBYTECODE': '1',
+        }
+        timings = []
+        imports = {}
+        for _ in range(repeat):
+            start = perf_counter()
+            completed = subprocess.run(
+                command, cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, check=True
+            )
+            timings.append((perf_counter() - start) * 1000)
+            imports = parse_importtime(completed.stderr)
+        return {
+            'p50_ms': round(statistics.median(timings), 1),
+            'p95_ms': round(percentile(timings, 95), 1),
+            'runs': repeat,
+            'top_imports': sorted(
+                imports.items(), key=lambda item: item[1], reverse=True
+            )[:top],
+        }
+
+
+def parse_importtime(stderr):
+    """
+    Собирает накопленное время импорта пакетов верхнего уровня
+    из вывода -X importtime, в микросекундах.
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit() or name.startswith('  '):
+            continue
+        imports[name.strip()] = int(cumulative)
+    return imports
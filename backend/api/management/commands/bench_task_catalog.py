@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.benchmarks import format_result, measure, rollback_after
+from challenge_engine.models import (
+    CategoryTasks, Task, UsersTasks,
+    TASK_ACTIVE_STATUSES, TASK_STATUS_COMPLETED
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает выборку доступных заданий через NOT IN и NOT EXISTS. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--completed', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, tasks, completed, repeat, **options):
+        with rollback_after():
+            user, category = self.seed(tasks, completed)
+            client = APIClient()
+            client.force_authenticate(user)
+
+            def not_in():
+                started = UsersTasks.objects.filter(
+                    initiator=user, status__in=TASK_ACTIVE_STATUSES
+                ).values_list('task_id', flat=True)
+                list(Task.objects.filter(category=category).exclude(
+                    id__in=started
+                )[:12])
+
+            def not_exists():
+                list(Task.objects.available_for(user).filter(
+                    category=category
+                )[:12])
+
+            @override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+            )
+            def endpoint():
+                client.get('/api/tasks/', {'category': category.slug})
+
+            for name, func in (
+                ('queryset NOT IN', not_in),
+                ('queryset NOT EXISTS', not_exists),
+                ('GET /api/tasks/?category=', endpoint),
+            ):
+                self.stdout.write(format_result(name, measure(func, repeat)))
+
+    def seed(self, tasks, completed):
+        user = User.objects.create_user('bench-catalog@slife.local')
+        category = CategoryTasks.objects.create(
+            title='Бенчмарк', slug='bench-catalog'
+        )
+        created = Task.objects.bulk_create(
+            Task(
+                title=f'Задание {i}',
+                slug=f'bench-task-{i}',
+                description='Описание',
+                short_description='Кратко',
+            )
+            for i in range(tasks)
+        )
+        Task.category.through.objects.bulk_create(
+            Task.category.through(task_id=task.id, categorytasks=category)
+            for task in created
+        )
+        UsersTasks.objects.bulk_create(
+            UsersTasks(
+                task=task,
+                initiator=user,
+                status=TASK_STATUS_COMPLETED,
+                completed_at=timezone.now()
+            )
+            for task in created[:completed]
+        )
+        return user, category
@@ -0,0 +1,130 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarks import format_result, measure, rollback_after
+from challenge_engine.models import CategoryTasks, Task
+from challenge_engine.search import search_tasks
+
+User = get_user_model()
+
+# Слова текстов заданий; частота убывает к концу списка (закон Ципфа)
+WORDS = (
+    'помочь друг сделать день утро вечер город парк книга спорт '
+    'прогулка бег зарядка музыка фильм рисунок письмо звонок семья '
+    'соседи уборка кухня ужин завтрак цветы растение волонтер приют '
+    'собака кошка велосипед бассейн шахматы гитара фотография выставка '
+    'музей театр концерт поход палатка костер рыбалка огород дача '
+    'пробежка марафон йога медитация дневник стихотворение открытка '
+    'подарок сюрприз благодарность комплимент улыбка'
+).split()
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+
+# Запросы: частое слово, редкое слово, два слова, два редких слова
+QUERIES = ('помочь', 'медитация', 'прогулка парк', 'марафон улыбка')
+
+PAGE_SIZE = 12
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает полнотекстовый поиск заданий (GIN на PostgreSQL, '
+        'FTS5 на SQLite) с icontains по трем полям. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, tasks, repeat, seed, **options):
+        self.stdout.write(f'СУБД: {connection.vendor}, заданий: {tasks}')
+        with rollback_after():
+            user, category = self.seed(tasks, random.Random(seed))
+            client = APIClient()
+            client.force_authenticate(user)
+            allowed_hosts = override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+            )
+            for text in QUERIES:
+                for name, search, queryset in (
+                    ('icontains', icontains, Task.objects.all()),
+                    ('search', search_tasks, Task.objects.all()),
+                    (
+                        'icontains+category', icontains,
+                        Task.objects.filter(category=category)
+                    ),
+                    (
+                        'search+category', search_tasks,
+                        Task.objects.filter(category=category)
+                    ),
+                ):
+                    self.stdout.write(format_result(
+                        f'{name} "{text}"',
+                        measure(lambda: page(search(queryset, text)), repeat)
+                    ))
+
+                def endpoint():
+                    with allowed_hosts:
+                        client.get('/api/tasks/search/', {'q': text})
+
+                self.stdout.write(format_result(
+                    f'GET /api/tasks/search/?q={text}',
+                    measure(endpoint, repeat)
+                ))
+
+    def seed(self, tasks, rng):
+        user = User.objects.create_user('bench-search@slife.local')
+        category = CategoryTasks.objects.create(
+            title='Бенчмарк поиска', slug='bench-search'
+        )
+
+        def text(words):
+            return ' '.join(rng.choices(WORDS, WEIGHTS, k=words))
+
+        created = Task.objects.bulk_create(
+            (
+                Task(
+                    title=text(4)[:100],
+                    slug=f'bench-search-{i}',
+                    short_description=text(12),
+                    description=text(60),
+                )
+                for i in range(tasks)
+            ),
+            batch_size=1000
+        )
+        # Категория у каждого десятого задания
+        Task.category.through.objects.bulk_create(
+            (
+                Task.category.through(task_id=task.id, categorytasks=category)
+                for task in created[::10]
+            ),
+            batch_size=1000
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Task._meta.db_table}')
+        return user, category
+
+
+def page(queryset):
+    """Как в пагинированном ответе: количество и первая страница"""
+    return queryset.count(), list(queryset[:PAGE_SIZE])
+
+
+def icontains(queryset, text):
+    """Прежний способ: каждое слово ищется подстрокой в любом из полей"""
+    for word in text.split():
+        queryset = queryset.filter(
+            Q(title__icontains=word) | Q(short_description__icontains=word)
+            | Q(description__icontains=word)
+        )
+    return queryset.order_by('-created_at', '-id')
@@ -0,0 +1,52 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import format_result, measure, rollback_after
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет регистрацию при занятых суффиксах username. '
+        'Данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', default='ivan')
+        parser.add_argument('--colliding', type=int, default=9000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, base, colliding, repeat, **options):
+        with rollback_after():
+            password = make_password(None)
+            User.objects.bulk_create(
+                User(
+                    email=f'{base}{suffix}@bench.slife.local',
+                    username=f'{base}{suffix:04d}',
+                    password=password
+                )
+                for suffix in random.sample(range(10000), colliding)
+            )
+            counter = iter(range(repeat * 2))
+
+            def legacy():
+                # Прежний алгоритм: exists() на каждую попытку
+                username = f'{base}{random.randint(0, 9999):04d}'
+                while User.objects.filter(username=username).exists():
+                    username = f'{base}{random.randint(0, 9999):04d}'
+
+            def signup():
+                User.objects.create_user(
+                    f'{base}@signup{next(counter)}.slife.local'
+                )
+
+            self.stdout.write(format_result(
+                'legacy exists() loop', measure(legacy, repeat, warmup=0)
+            ))
+            self.stdout.write(format_result(
+                'create_user()', measure(signup, repeat, warmup=0)
+            ))
@@ -0,0 +1,43 @@
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.seeding import SEED_PASSWORD, Seeder, SeedVolumes
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД синтетическими пользователями, заданиями, '
+        'подписками, постами и лайками для нагрузочных замеров'
+    )
+
+    def add_arguments(self, parser):
+        for field in fields(SeedVolumes):
+            parser.add_argument(
+                f'--{field.name.replace("_", "-")}', type=int,
+                default=field.default
+            )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--seed', type=int, help='Зерно генератора для повторяемости'
+        )
+
+    def handle(self, *args, batch_size, seed, **options):
+        volumes = SeedVolumes(**{
+            field.name: options[field.name] for field in fields(SeedVolumes)
+        })
+        seeder = Seeder(
+            volumes, batch_size, seed, log=lambda message: self.stdout.write(
+                f'  {message}'
+            )
+        )
+        with transaction.atomic():
+            seeder.seed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы, метка запуска {seeder.run_id}, '
+            f'пароль пользователей "{SEED_PASSWORD}"'
+        ))
@@ -0,0 +1,77 @@
+"""
+Метрики запросов в формате Prometheus.
+
+Счетчик и гистограмма задержек размечены именем маршрута (url_name,
+например tasks-list или user-subscriptions), методом и статусом ответа.
+Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR, значения
+пишутся в mmap-файлы этого каталога и /api/metrics/ суммирует их по всем
+воркерам. Каталог очищается перед запуском сервера, а для завершенных
+воркеров вызывается mark_process_dead: оба хука описаны
+в gunicorn.conf.py.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest
+)
+from prometheus_client import multiprocess
+
+UNRESOLVED_ROUTE = 'unresolved'
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+REQUESTS = Counter(
+    'slife_http_requests',
+    'Количество обработанных запросов',
+    ('route', 'method', 'status')
+)
+REQUEST_LATENCY = Histogram(
+    'slife_http_request_duration_seconds',
+    'Время обработки запроса',
+    ('route', 'method', 'status'),
+    buckets=LATENCY_BUCKETS
+)
+
+
+def route_name(request):
+    """
+    Имя маршрута без параметров URL, чтобы число меток не росло
+    вместе с количеством объектов.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    return match.url_name or match.route
+
+
+# Кэш дочерних метрик: labels() на каждый запрос заметно дороже
+_children = {}
+
+
+def record_request(route, method, status, duration):
+    key = (route, method, status)
+    children = _children.get(key)
+    if children is None:
+        children = _children[key] = (
+            REQUESTS.labels(*key), REQUEST_LATENCY.labels(*key)
+        )
+    children[0].inc()
+    children[1].observe(duration)
+
+
+def is_multiprocess():
+    return 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+
+def render_metrics():
+    """Возвращает (текст экспозиции, content type)"""
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,257 @@
+"""
+Замеры запросов: количество и время SQL, самый медленный запрос
+и время сериализации.
+
+Итоги пишутся в лог api.timing одной JSON-строкой на запрос
+на уровне DEBUG, сотрудникам дополнительно отдаются в заголовке
+Server-Timing. Сериализация замеряется у сериализаторов
+с TimedSerializerMixin. Запросы дольше REQUEST_TIMING_SLOW_MS логируются
+на уровне WARNING с полным списком SQL и повторяющимися запросами
+(признак N+1). Параметры запросов не логируются.
+"""
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.functional import SimpleLazyObject
+from rest_framework import serializers
+
+from .metrics import record_request, route_name
+
+logger = logging.getLogger('api.timing')
+
+_current_timing = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса; вызывается как execute_wrapper"""
+
+    def __init__(self):
+        self.queries = []
+        self.sql_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (perf_counter() - start) * 1000
+            self.queries.append((sql, duration))
+            self.sql_ms += duration
+
+    @property
+    def slowest(self):
+        return max(self.queries, key=lambda query: query[1], default=None)
+
+    def duplicates(self):
+        """Одинаковые SQL-шаблоны, выполненные больше одного раза"""
+        counts = Counter(sql for sql, _ in self.queries)
+        durations = Counter()
+        for sql, duration in self.queries:
+            durations[sql] += duration
+        return [
+            {'sql': sql, 'count': count, 'ms': round(durations[sql], 3)}
+            for sql, count in counts.most_common() if count > 1
+        ]
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def _add_execute_wrapper(connection, **kwargs):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def instrument_connections():
+    """
+    Подключает замер SQL ко всем соединениям, в том числе открытым позже
+    в других потоках. Замер берется из контекстной переменной, которую
+    sync_to_async передает в поток, поэтому учитываются и запросы
+    асинхронного ORM.
+    """
+    for connection in connections.all(initialized_only=True):
+        _add_execute_wrapper(connection)
+    connection_created.connect(
+        _add_execute_wrapper, dispatch_uid='api.timing.execute_wrapper'
+    )
+
+
+@contextmanager
+def timed_serialization():
+    """
+    Учитывает время блока как время сериализации текущего запроса.
+    Вложенные блоки учитываются во внешнем.
+    """
+    timing = _current_timing.get()
+    if timing is None or timing.serializing:
+        yield
+        return
+    timing.serializing = True
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timing.serializer_ms += (perf_counter() - start) * 1000
+        timing.serializing = False
+
+
+class TimedSerializerMixin:
+    """
+    Замеряет Serializer.data сериализаторов API. Время включает SQL,
+    выполненный во время сериализации. Для many=True используется
+    TimedListSerializer, если в Meta не задан другой list_serializer_class.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = cls.__dict__.get('Meta')
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+class TimedListSerializer(
+    TimedSerializerMixin, serializers.ListSerializer
+):
+    pass
+
+
+class RequestTimingMiddleware:
+    # Под ASGI асинхронные представления не переводятся в поток
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        instrument_connections()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        # request.user здесь уже выставлен аутентификацией DRF
+        return self.finish(
+            request, response, timing, start, getattr(request, 'user', None)
+        )
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        user = getattr(request, 'user', None)
+        # Ленивый пользователь сессии читается из БД только через auser()
+        if isinstance(user, SimpleLazyObject):
+            user = await request.auser()
+        return self.finish(request, response, timing, start, user)
+
+    def finish(self, request, response, timing, start, user):
+        duration = (perf_counter() - start) * 1000
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = self.server_timing(timing, duration)
+        self.log(request, response, timing, duration, user)
+        return response
+
+    @staticmethod
+    def server_timing(timing, duration):
+        metrics = [
+            f'db;dur={timing.sql_ms:.3f};desc="{len(timing.queries)} queries"'
+        ]
+        if timing.queries:
+            metrics.append(f'db-slowest;dur={timing.slowest[1]:.3f}')
+        metrics += [
+            f'serializer;dur={timing.serializer_ms:.3f}',
+            f'total;dur={duration:.3f}',
+        ]
+        return ', '.join(metrics)
+
+    @staticmethod
+    def log(request, response, timing, duration, user):
+        slowest_sql, slowest_ms = timing.slowest or (None, 0.0)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user_id': getattr(user, 'pk', None),
+            'duration_ms': round(duration, 3),
+            'queries': len(timing.queries),
+            'sql_ms': round(timing.sql_ms, 3),
+            'slowest_sql_ms': round(slowest_ms, 3),
+            'slowest_sql': slowest_sql,
+            'serializer_ms': round(timing.serializer_ms, 3),
+        }
+        if duration < settings.REQUEST_TIMING_SLOW_MS:
+            logger.debug(json.dumps(record, ensure_ascii=False))
+            return
+        record['all_queries'] = [
+            {'sql': sql, 'ms': round(query_ms, 3)}
+            for sql, query_ms in timing.queries
+        ]
+        record['duplicates'] = timing.duplicates()
+        logger.warning(json.dumps(record, ensure_ascii=False))
+
+
+class RequestMetricsMiddleware:
+    """Записывает количество и задержку запросов в api.metrics"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    @staticmethod
+    def record(request, response, start):
+        record_request(
+            route_name(request), request.method, response.status_code,
+            perf_counter() - start
+        )
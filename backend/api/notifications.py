@@ -0,0 +1,225 @@
+"""
+Асинхронная отправка push-уведомлений на DeviceToken.
+
+Запросы только ставят событие в очередь после коммита транзакции.
+Фоновый поток выбирает токены получателей, делит их на пачки
+по MULTICAST_BATCH_SIZE и отправляет через транспорт в ограниченном
+пуле потоков. Токены, которые транспорт признал недействительными,
+удаляются.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from social_service.models import Post
+from user_service.models import DeviceToken
+from .firebase import get_firebase_app
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+# Ограничение FCM на количество токенов в одном multicast-сообщении
+MULTICAST_BATCH_SIZE = 500
+
+TASK_CONFIRMED_TITLE = 'Задание подтверждено'
+TASK_CONFIRMED_BODY = 'Задание «{}» подтверждено'
+NEW_SUBSCRIBER_TITLE = 'Новый подписчик'
+NEW_SUBSCRIBER_BODY = '{} подписался на вас'
+POST_LIKED_TITLE = 'Новый лайк'
+POST_LIKED_BODY = '{} оценил ваш пост'
+
+
+class BaseTransport:
+    """Транспорт доставки: отправляет одну пачку токенов"""
+    def send_multicast(self, tokens, title, body, data):
+        """Возвращает список токенов, которые нужно удалить"""
+        raise NotImplementedError
+
+
+class FirebaseTransport(BaseTransport):
+    """Отправка через Firebase Cloud Messaging"""
+    def send_multicast(self, tokens, title, body, data):
+        app = get_firebase_app()
+        if app is None:
+            return []
+
+        from firebase_admin import messaging
+
+        response = messaging.send_each_for_multicast(
+            messaging.MulticastMessage(
+                tokens=tokens,
+                notification=messaging.Notification(title=title, body=body),
+                data=data
+            ),
+            app=app
+        )
+        return [
+            token
+            for token, result in zip(tokens, response.responses)
+            if isinstance(result.exception, (
+                messaging.UnregisteredError,
+                messaging.SenderIdMismatchError
+            ))
+        ]
+
+
+class FakeTransport(BaseTransport):
+    """
+    Локальная замена FCM для тестов и разработки:
+    запоминает сообщения, токены из invalid_tokens считает удаленными.
+    """
+    def __init__(self):
+        self.sent = []
+        self.invalid_tokens = set()
+        self._lock = threading.Lock()
+
+    def send_multicast(self, tokens, title, body, data):
+        with self._lock:
+            self.sent.append({
+                'tokens': list(tokens), 'title': title,
+                'body': body, 'data': data
+            })
+        return [token for token in tokens if token in self.invalid_tokens]
+
+
+class NotificationDispatcher:
+    def __init__(self, transport, max_workers, max_queue_size):
+        self.transport = transport
+        # При переполнении новые события отбрасываются, см. _enqueue
+        self._queue = queue.Queue(max_queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='push'
+        )
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def notify(self, user_ids, title, body, data=None):
+        """
+        Ставит уведомление в очередь после коммита транзакции.
+        user_ids — список id или queryset с одним полем id пользователя,
+        он вычисляется в фоновом потоке. body — строка или функция без
+        аргументов, которая также вызывается в фоновом потоке.
+        """
+        event = (user_ids, title, body, {
+            key: str(value) for key, value in (data or {}).items()
+        })
+        transaction.on_commit(lambda: self._enqueue(event))
+
+    def flush(self):
+        """Дожидается отправки всех событий из очереди"""
+        self._queue.join()
+
+    def _enqueue(self, event):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='push-dispatcher', daemon=True
+                )
+                self._worker.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning(
+                'Очередь уведомлений переполнена, событие "%s" отброшено',
+                event[3].get('event')
+            )
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                self._dispatch(*event)
+            except Exception:
+                logger.exception('Не удалось отправить уведомление')
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+    def _dispatch(self, user_ids, title, body, data):
+        if callable(body):
+            body = body()
+        tokens = list(DeviceToken.objects.filter(
+            user_id__in=user_ids
+        ).values_list('token', flat=True))
+        futures = [
+            self._executor.submit(
+                self.transport.send_multicast,
+                tokens[start:start + MULTICAST_BATCH_SIZE], title, body, data
+            )
+            for start in range(0, len(tokens), MULTICAST_BATCH_SIZE)
+        ]
+        invalid = []
+        for future in futures:
+            try:
+                invalid.extend(future.result())
+            except Exception:
+                logger.exception('Ошибка транспорта уведомлений')
+        if invalid:
+            DeviceToken.objects.filter(token__in=invalid).delete()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher(
+                import_string(settings.NOTIFICATIONS_TRANSPORT)(),
+                settings.NOTIFICATIONS_MAX_WORKERS,
+                settings.NOTIFICATIONS_QUEUE_SIZE
+            )
+    return _dispatcher
+
+
+def notify_task_confirmed(user_task):
+    get_dispatcher().notify(
+        [user_task.initiator_id],
+        TASK_CONFIRMED_TITLE,
+        TASK_CONFIRMED_BODY.format(user_task.task.title),
+        {'event': 'task_confirmed', 'user_task_id': user_task.id}
+    )
+
+
+def notify_new_subscriber(subscribe):
+    notify_new_subscriptions(subscribe.user, [subscribe.subscribing_id])
+
+
+def notify_new_subscriptions(user, author_ids):
+    """
+    Одно событие для всех авторов author_ids, на которых подписался user.
+    Используется и для массовой подписки, при которой post_save
+    не отправляется.
+    """
+    if not author_ids:
+        return
+    get_dispatcher().notify(
+        list(author_ids),
+        NEW_SUBSCRIBER_TITLE,
+        NEW_SUBSCRIBER_BODY.format(user.username),
+        {'event': 'new_subscriber', 'user_id': user.pk}
+    )
+
+
+def notify_post_liked(post_like):
+    # Имя автора лайка читается в фоновом потоке, а не в запросе
+    user_id = post_like.user_id
+    get_dispatcher().notify(
+        Post.objects.filter(pk=post_like.post_id).exclude(
+            author_id=user_id
+        ).values('author_id'),
+        POST_LIKED_TITLE,
+        lambda: POST_LIKED_BODY.format(
+            User.objects.values_list('username', flat=True).get(pk=user_id)
+        ),
+        {'event': 'post_liked', 'post_id': post_like.post_id}
+    )
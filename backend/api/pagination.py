@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по id подписки (Subscribe.id).
+    Страница выбирается условием WHERE subscription_id < курсор,
+    поэтому время ответа не зависит от числа подписок.
+    """
+    ordering = '-subscription_id'
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация каталога заданий по (created_at, id).
+    Использует индекс task_created_at_id_idx вместо OFFSET.
+    """
+    ordering = ('-created_at', '-id')
@@ -8,5 +8,5 @@ class IsAuthorOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.user.is_staff or
-            obj.initiator == request.user
+            obj.initiator_id == request.user.id
         ) 
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""Генерация синтетических данных для нагрузочных замеров"""
+import random
+from collections import Counter
+from dataclasses import dataclass
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from challenge_engine.models import (
+    CategoryTasks, Task, TaskRewards, UsersTasks, TASK_DIFFICULTY_CHOICES,
+    TASK_STATUS_COMPLETED, TASK_STATUS_CONFIRMED, TASK_STATUSES
+)
+from social_service.models import Comment, CommentLike, Post, PostLike
+from user_service.models import Skill, Subscribe, UserSkills
+from user_service.skills import MAX_SKILL_LEVEL, level_for_experience
+
+User = get_user_model()
+
+SEED_PASSWORD = 'seed-password'
+SEED_EMAIL_DOMAIN = 'seed.slife.local'
+SEED_IMAGE = 'social_service/posts/images/seed.jpg'
+
+
+@dataclass
+class SeedVolumes:
+    """Объемы данных; *_per_* задают среднее количество на объект"""
+    users: int = 1000
+    skills: int = 10
+    categories: int = 10
+    tasks: int = 500
+    rewards_per_task: int = 2
+    tasks_per_user: int = 5
+    skills_per_user: int = 5
+    subscriptions_per_user: int = 10
+    posts_per_user: int = 2
+    comments_per_post: int = 3
+    likes_per_post: int = 5
+    likes_per_comment: int = 1
+
+
+class Seeder:
+    """
+    Создает связанные данные всех моделей через bulk_create.
+    Сигналы при bulk_create не срабатывают, поэтому денормализованные
+    счетчики выставляются в конце: подписки - recompute_follow_counters(),
+    лайки - по созданным строкам.
+    Все имена содержат метку запуска, повторные запуски не конфликтуют.
+    """
+
+    def __init__(self, volumes, batch_size=1000, seed=None, log=None):
+        self.volumes = volumes
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.run_id = uuid4().hex[:8]
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def seed(self):
+        users = self.create_users()
+        skills = self.create_objects(Skill, (
+            Skill(title=f'Навык {self.run_id}-{i}')
+            for i in range(self.volumes.skills)
+        ))
+        categories = self.create_objects(CategoryTasks, (
+            CategoryTasks(
+                title=f'Категория {i}', slug=f'seed-{self.run_id}-{i}'
+            )
+            for i in range(self.volumes.categories)
+        ))
+        tasks = self.create_tasks(skills, categories)
+        self.create_user_tasks(users, tasks)
+        self.create_user_skills(users, skills)
+        self.create_subscriptions(users)
+        self.create_social(users)
+        return self.counts
+
+    def create_objects(self, model, objects):
+        created = model.objects.bulk_create(
+            objects, batch_size=self.batch_size
+        )
+        self.counts[model._meta.label] = (
+            self.counts.get(model._meta.label, 0) + len(created)
+        )
+        self.log(f'{model._meta.label}: {len(created)}')
+        return created
+
+    def sample(self, population, average):
+        """Случайная выборка размером около average без повторов"""
+        size = min(len(population), self.random.randint(0, average * 2))
+        return self.random.sample(population, size)
+
+    def create_users(self):
+        # Хэш пароля один на всех: make_password занимает десятки мс
+        password = make_password(SEED_PASSWORD)
+        return self.create_objects(User, (
+            User(
+                email=f'{self.run_id}-{i}@{SEED_EMAIL_DOMAIN}',
+                username=f's{self.run_id}{i}',
+                password=password
+            )
+            for i in range(self.volumes.users)
+        ))
+
+    def create_tasks(self, skills, categories):
+        tasks = self.create_objects(Task, (
+            Task(
+                title=f'Задание {i}',
+                slug=f'seed-{self.run_id}-{i}',
+                description='Описание синтетического задания',
+                short_description='Синтетическое задание',
+                difficulty=self.random.choice(TASK_DIFFICULTY_CHOICES)[0]
+            )
+            for i in range(self.volumes.tasks)
+        ))
+        self.create_objects(TaskRewards, (
+            TaskRewards(
+                task=task,
+                reward=skill,
+                quantity=self.random.randint(10, 200),
+                is_additional=index > 0 and self.random.random() < 0.3
+            )
+            for task in tasks
+            for index, skill in enumerate(
+                self.sample(skills, self.volumes.rewards_per_task)
+            )
+        ))
+        self.create_objects(Task.category.through, (
+            Task.category.through(task=task, categorytasks=category)
+            for task in tasks
+            for category in self.sample(categories, 1) or categories[:1]
+        ))
+        return tasks
+
+    def create_user_tasks(self, users, tasks):
+        statuses = [status for status, _ in TASK_STATUSES]
+        now = timezone.now()
+
+        def build(user, task):
+            status = self.random.choice(statuses)
+            target = self.random.choice(users)
+            return UsersTasks(
+                task=task,
+                initiator=user,
+                target_user=target if target != user else None,
+                status=status,
+                confirmation_id=UsersTasks.build_confirmation_id(
+                    task.id, user.id
+                ),
+                completed_at=now if status in (
+                    TASK_STATUS_COMPLETED, TASK_STATUS_CONFIRMED
+                ) else None,
+                confirmed_at=now if status == TASK_STATUS_CONFIRMED else None,
+                rating=(
+                    self.random.randint(1, 5)
+                    if status == TASK_STATUS_CONFIRMED else None
+                ),
+                # Синтетические награды не начисляются settle_rewards
+                rewards_settled_at=(
+                    now if status == TASK_STATUS_CONFIRMED else None
+                )
+            )
+
+        self.create_objects(UsersTasks, (
+            build(user, task)
+            for user in users
+            for task in self.sample(tasks, self.volumes.tasks_per_user)
+        ))
+
+    def create_user_skills(self, users, skills):
+        max_experience = 50 * MAX_SKILL_LEVEL * (MAX_SKILL_LEVEL - 1)
+
+        def build(user, skill):
+            experience = int(self.random.paretovariate(1.5) * 50) % (
+                max_experience
+            )
+            return UserSkills(
+                user=user,
+                skill=skill,
+                level=level_for_experience(experience),
+                experience=experience
+            )
+
+        self.create_objects(UserSkills, (
+            build(user, skill)
+            for user in users
+            for skill in self.sample(skills, self.volumes.skills_per_user)
+        ))
+
+    def create_subscriptions(self, users):
+        self.create_objects(Subscribe, (
+            Subscribe(user=user, subscribing=author)
+            for user in users
+            for author in self.sample(
+                users, self.volumes.subscriptions_per_user
+            )
+            if author != user
+        ))
+        User.objects.filter(
+            username__startswith=f's{self.run_id}'
+        ).recompute_follow_counters()
+
+    def create_social(self, users):
+        posts = self.create_objects(Post, (
+            Post(author=user, image=SEED_IMAGE, text=f'Пост {i}')
+            for user in users
+            for i in range(
+                self.random.randint(0, self.volumes.posts_per_user * 2)
+            )
+        ))
+        comments = self.create_objects(Comment, (
+            Comment(
+                post=post, author=self.random.choice(users),
+                text='Синтетический комментарий'
+            )
+            for post in posts
+            for _ in range(
+                self.random.randint(0, self.volumes.comments_per_post * 2)
+            )
+        ))
+        self.create_likes(PostLike, 'post', posts, users,
+                          self.volumes.likes_per_post)
+        self.create_likes(CommentLike, 'comment', comments, users,
+                          self.volumes.likes_per_comment)
+
+    def create_likes(self, model, field, objects, users, average):
+        likes = self.create_objects(model, (
+            model(user=user, **{field: obj})
+            for obj in objects
+            for user in self.sample(users, average)
+        ))
+        counts = Counter(getattr(like, f'{field}_id') for like in likes)
+        liked = [obj for obj in objects if counts[obj.pk]]
+        for obj in liked:
+            obj.likes_count = counts[obj.pk]
+        if liked:
+            type(liked[0]).objects.bulk_update(
+                liked, ['likes_count'], batch_size=self.batch_size
+            )
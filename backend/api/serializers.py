@@ -2,18 +2,19 @@ from django.contrib.auth import get_user_model
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import serializers
 
-from user_service.models import Subscribe, UserSkills
+from user_service.models import Skill, SkillRank, Subscribe, UserSkills
+from user_service.skills import with_default_skills
+from user_service.subscriptions import BULK_SUBSCRIBE_MAX_IDS
 from challenge_engine.models import Task, CategoryTasks, UsersTasks, TaskRewards
+from .middleware import TimedSerializerMixin
 
 
 User = get_user_model()
 
 
-class SlifeUserSerializer(DjoserUserSerializer):
+class SlifeUserSerializer(TimedSerializerMixin, DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     skills = serializers.SerializerMethodField()
-    subscribers_count = serializers.SerializerMethodField()
-    authors_count = serializers.SerializerMethodField()
 
     class Meta(DjoserUserSerializer.Meta):
         fields = (
@@ -23,6 +24,9 @@ class SlifeUserSerializer(DjoserUserSerializer):
         )
 
     def get_is_subscribed(self, subscribing):
+        # Значение из with_profile_stats(), если queryset аннотирован
+        if hasattr(subscribing, 'is_subscribed'):
+            return subscribing.is_subscribed
         request = self.context.get('request')
         return (
             request and request.user.is_authenticated
@@ -32,17 +36,34 @@ class SlifeUserSerializer(DjoserUserSerializer):
         )
 
     def get_skills(self, obj):
-        skills = UserSkills.objects.filter(user=obj)
-        return UserSkillsSerializer(skills, many=True).data
+        # Список навыков загружается один раз на весь ответ
+        if 'all_skills' not in self.context:
+            self.context['all_skills'] = list(Skill.objects.all())
+        # Использует кэш prefetch_related('user_skills'), если он есть
+        return UserSkillsSerializer(
+            with_default_skills(
+                obj, obj.user_skills.all(), self.context['all_skills']
+            ),
+            many=True
+        ).data
 
-    def get_subscribers_count(self, obj):
-        return obj.subscribers.count()
 
-    def get_authors_count(self, obj):
-        return obj.authors.count()
+class UserSuggestionSerializer(SlifeUserSerializer):
+    mutual_count = serializers.IntegerField(read_only=True)
 
+    class Meta(SlifeUserSerializer.Meta):
+        fields = (*SlifeUserSerializer.Meta.fields, 'mutual_count')
 
-class UserSkillsSerializer(serializers.ModelSerializer):
+
+class BulkSubscribeSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_SUBSCRIBE_MAX_IDS
+    )
+
+
+class UserSkillsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     skill_title = serializers.CharField(source='skill.title', read_only=True)
 
     class Meta:
@@ -50,13 +71,22 @@ class UserSkillsSerializer(serializers.ModelSerializer):
         fields = ('id', 'skill_title', 'level', 'experience')
 
 
-class CategoryTasksSerializer(serializers.ModelSerializer):
+class SkillRankSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    avatar = serializers.ImageField(source='user.avatar', read_only=True)
+
+    class Meta:
+        model = SkillRank
+        fields = ('rank', 'user', 'username', 'avatar', 'level', 'experience')
+
+
+class CategoryTasksSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CategoryTasks
         fields = ('id', 'title', 'slug')
 
 
-class TaskRewardSerializer(serializers.ModelSerializer):
+class TaskRewardSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     title = serializers.CharField(source='reward.title')
     quantity = serializers.IntegerField()
     is_additional = serializers.BooleanField()
@@ -67,7 +97,7 @@ class TaskRewardSerializer(serializers.ModelSerializer):
         fields = ('title', 'quantity', 'is_additional', 'description')
 
 
-class TaskBriefSerializer(serializers.ModelSerializer):
+class TaskBriefSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для краткого отображения задания"""
     category = CategoryTasksSerializer(many=True, read_only=True)
     rewards = serializers.SerializerMethodField()
@@ -77,14 +107,18 @@ class TaskBriefSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'short_description', 'rewards', 'category', 'difficulty']
 
     def get_rewards(self, obj):
-        rewards = obj.task_rewards.filter(is_additional=False)
+        # Фильтруем в Python, чтобы использовать кэш with_rewards()
+        rewards = (
+            reward for reward in obj.task_rewards.all()
+            if not reward.is_additional
+        )
         return [{
             'title': reward.reward.title,
             'quantity': reward.quantity
         } for reward in rewards]
 
 
-class TaskFullSerializer(serializers.ModelSerializer):
+class TaskFullSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для полной информации о задании"""
     category = CategoryTasksSerializer(many=True, read_only=True)
     rewards = serializers.SerializerMethodField()
@@ -103,7 +137,7 @@ class TaskFullSerializer(serializers.ModelSerializer):
         } for reward in rewards]
 
 
-class UsersTasksListSerializer(serializers.ModelSerializer):
+class UsersTasksListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     task = TaskBriefSerializer(read_only=True)
     rating = serializers.SerializerMethodField()
     target_user_info = serializers.SerializerMethodField()
@@ -128,7 +162,7 @@ class UsersTasksListSerializer(serializers.ModelSerializer):
         return obj.target_user_name
 
 
-class UsersTasksDetailSerializer(serializers.ModelSerializer):
+class UsersTasksDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     task = TaskFullSerializer(read_only=True)
     target_user_info = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social_service.models import PostLike
+from user_service.models import Subscribe, users_updated
+from .authentication import user_cache
+from .notifications import notify_new_subscriber, notify_post_liked
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    forget_cached_users([instance.pk])
+
+
+@receiver(users_updated)
+def invalidate_updated_users(sender, user_ids, **kwargs):
+    forget_cached_users(user_ids)
+
+
+def forget_cached_users(user_ids):
+    """
+    Сбрасывает кэш аутентификации сразу и после коммита: иначе
+    параллельный запрос может успеть закэшировать строку до коммита.
+    """
+    def forget():
+        for user_id in user_ids:
+            user_cache.delete(user_id)
+
+    forget()
+    transaction.on_commit(forget)
+
+
+@receiver(post_save, sender=Subscribe)
+def send_new_subscriber_notification(sender, instance, created, **kwargs):
+    if created:
+        notify_new_subscriber(instance)
+
+
+@receiver(post_save, sender=PostLike)
+def send_post_liked_notification(sender, instance, created, **kwargs):
+    if created:
+        notify_post_liked(instance)
@@ -0,0 +1,580 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from challenge_engine.checks import check_shared_catalog_cache
+from challenge_engine.models import (
+    CategoryTasks, Task, TaskRewards, UsersTasks, TASK_STATUS_COMPLETED
+)
+from slife.testing import QueryPlanTestMixin
+from social_service.models import Comment, Post, PostLike
+from user_service.models import DeviceToken, Skill, Subscribe
+from .authentication import user_cache
+from .firebase import get_firebase_app
+from .metrics import UNRESOLVED_ROUTE
+from .notifications import (
+    FakeTransport, FirebaseTransport, NotificationDispatcher,
+    MULTICAST_BATCH_SIZE, notify_post_liked, notify_task_confirmed
+)
+from .seeding import Seeder, SeedVolumes
+
+User = get_user_model()
+
+DRF_SERIALIZER_DATA = serializers.Serializer.__dict__['data']
+
+# страница id + задания + награды с навыками + категории
+TASKS_PAGE_QUERIES = 4
+# только страница id
+TASKS_PAGE_CACHED_QUERIES = 1
+
+# Объем данных, на котором проверяются планы запросов
+PLAN_SEED_VOLUMES = SeedVolumes(
+    users=200, skills=5, categories=5, tasks=100, posts_per_user=3
+)
+
+
+class UserCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cached@slife.local')
+        cls.author = User.objects.create_user('author@slife.local')
+
+    def setUp(self):
+        cache.clear()
+        user_cache.set(self.user)
+        self.addCleanup(user_cache.delete, self.user.pk)
+
+    def assertForgotten(self, user_id):
+        # Проверяются оба уровня: общий кэш и LRU процесса
+        self.assertIsNone(cache.get(user_cache._key(user_id)))
+        self.assertNotIn(str(user_id), user_cache._local)
+
+    def test_cached_user_is_returned_as_copy(self):
+        cached = user_cache.get(self.user.pk)
+        self.assertEqual(cached.pk, self.user.pk)
+        self.assertIsNot(cached, user_cache.get(self.user.pk))
+
+    def test_save_invalidates_cache(self):
+        self.user.first_name = 'Иван'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertForgotten(self.user.pk)
+
+    def test_delete_invalidates_cache(self):
+        user = User.objects.create_user('deleted@slife.local')
+        user_cache.set(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertForgotten(user.pk)
+
+    def test_counter_updates_invalidate_cache(self):
+        user_cache.set(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.create(user=self.user, subscribing=self.author)
+        self.assertForgotten(self.user.pk)
+        self.assertForgotten(self.author.pk)
+
+    def test_deactivation_by_update_rejects_cached_user(self):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(self.user)}'
+        )
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.update_users([self.user.pk], is_active=False)
+        self.assertForgotten(self.user.pk)
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+
+
+class NotificationsTest(TransactionTestCase):
+    """
+    Фоновый поток читает токены своим соединением, поэтому данные
+    должны быть закоммичены: используется TransactionTestCase
+    """
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.dispatcher = NotificationDispatcher(self.transport, 2, 100)
+        patcher = mock.patch(
+            'api.notifications._dispatcher', self.dispatcher
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('user@slife.local')
+        self.author = User.objects.create_user('author@slife.local')
+        DeviceToken.objects.create(
+            user=self.author, token='author-token', device_type='ios'
+        )
+
+    def events(self):
+        self.dispatcher.flush()
+        return [
+            (message['data']['event'], message['tokens'])
+            for message in self.transport.sent
+        ]
+
+    def test_events_are_sent_to_recipient_tokens(self):
+        Subscribe.objects.create(user=self.user, subscribing=self.author)
+        post = Post.objects.create(
+            author=self.author, image='post.png', text='Пост'
+        )
+        PostLike.objects.create(user=self.user, post=post)
+        # Фоновый поток читает посты, а в SQLite с общим кэшем чтение
+        # блокирует таблицу для UPDATE счетчика следующего лайка
+        self.dispatcher.flush()
+        # Свой лайк автору не отправляется
+        PostLike.objects.create(user=self.author, post=post)
+        user_task = UsersTasks.objects.create(
+            task=Task.objects.create(
+                title='Задание', slug='task', description='Описание',
+                short_description='Кратко'
+            ),
+            initiator=self.author
+        )
+        notify_task_confirmed(user_task)
+        self.assertEqual(sorted(self.events()), [
+            ('new_subscriber', ['author-token']),
+            ('post_liked', ['author-token']),
+            ('task_confirmed', ['author-token']),
+        ])
+
+    def test_like_does_not_read_user_in_request(self):
+        post = Post.objects.create(
+            author=self.author, image='post.png', text='Пост'
+        )
+        with self.assertNumQueries(0):
+            notify_post_liked(PostLike(user_id=self.user.pk, post=post))
+        self.dispatcher.flush()
+        [message] = self.transport.sent
+        self.assertIn(self.user.username, message['body'])
+
+    def test_full_queue_drops_events(self):
+        dispatcher = NotificationDispatcher(self.transport, 2, 1)
+        # Поток-обработчик не забирает события из очереди
+        with mock.patch.object(dispatcher, '_run'), self.assertLogs(
+            'api.notifications', 'WARNING'
+        ) as logs:
+            for _ in range(2):
+                dispatcher.notify([self.author.pk], 'Заголовок', 'Текст', {
+                    'event': 'test'
+                })
+        self.assertEqual(dispatcher._queue.qsize(), 1)
+        self.assertIn('переполнена', logs.output[0])
+
+    def test_tokens_are_sent_in_multicast_batches(self):
+        DeviceToken.objects.bulk_create(
+            DeviceToken(
+                user=self.author, token=f'token-{i}', device_type='android'
+            )
+            for i in range(MULTICAST_BATCH_SIZE * 2)
+        )
+        Subscribe.objects.create(user=self.user, subscribing=self.author)
+        batches = [tokens for _, tokens in self.events()]
+        self.assertEqual(
+            sorted(map(len, batches)),
+            [1, MULTICAST_BATCH_SIZE, MULTICAST_BATCH_SIZE]
+        )
+        tokens = {token for batch in batches for token in batch}
+        self.assertEqual(len(tokens), MULTICAST_BATCH_SIZE * 2 + 1)
+
+    def test_invalid_tokens_are_removed(self):
+        DeviceToken.objects.create(
+            user=self.author, token='stale-token', device_type='android'
+        )
+        self.transport.invalid_tokens.add('stale-token')
+        Subscribe.objects.create(user=self.user, subscribing=self.author)
+        self.events()
+        self.assertEqual(
+            list(DeviceToken.objects.values_list('token', flat=True)),
+            ['author-token']
+        )
+
+
+class CatalogCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@slife.local')
+        cls.category, cls.other_category = (
+            CategoryTasks.objects.create(title=title, slug=slug)
+            for title, slug in (('Спорт', 'sport'), ('Учеба', 'study'))
+        )
+        cls.task = Task.objects.create(
+            title='Пробежка', slug='run', description='Описание',
+            short_description='Кратко'
+        )
+        cls.task.category.add(cls.category)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_categories_are_served_from_cache(self):
+        first = self.client.get('/api/categories/')
+        self.assertEqual(first.status_code, 200)
+        # Посторонние параметры не создают новых записей в кэше
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/categories/?utm=1')
+        self.assertEqual(response.data, first.data)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+    def test_not_modified_for_current_etag(self):
+        path = f'/api/tasks/{self.task.pk}/'
+        etag = self.client.get(path)['ETag']
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_save_invalidates_catalog(self):
+        path = f'/api/tasks/{self.task.pk}/'
+        etag = self.client.get(path)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = 'Вечерняя пробежка'
+            self.task.save()
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Вечерняя пробежка')
+
+    def test_category_change_invalidates_catalog(self):
+        path = f'/api/tasks/{self.task.pk}/'
+        self.client.get(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.category.add(self.other_category)
+        response = self.client.get(path)
+        self.assertEqual(
+            {category['slug'] for category in response.data['category']},
+            {'sport', 'study'}
+        )
+
+    @override_settings(DEBUG=False)
+    def test_deploy_check_requires_shared_cache(self):
+        self.assertEqual(
+            [error.id for error in check_shared_catalog_cache(None)],
+            ['challenge_engine.E001']
+        )
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://127.0.0.1:6379',
+        }}):
+            self.assertEqual(check_shared_catalog_cache(None), [])
+
+
+class TaskListQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader@slife.local')
+        skills = Skill.objects.bulk_create(
+            Skill(title=f'Навык {i}') for i in range(3)
+        )
+        categories = CategoryTasks.objects.bulk_create(
+            CategoryTasks(title=f'Категория {i}', slug=f'category-{i}')
+            for i in range(3)
+        )
+        for i in range(15):
+            task = Task.objects.create(
+                title=f'Задание {i}', slug=f'task-{i}',
+                description='Описание', short_description='Кратко'
+            )
+            task.category.set(categories)
+            TaskRewards.objects.bulk_create(
+                TaskRewards(task=task, reward=skill, quantity=10)
+                for skill in skills
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_page_is_served_in_fixed_queries(self):
+        with self.assertNumQueries(TASKS_PAGE_QUERIES):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(len(response.data['results'][0]['rewards']), 3)
+        # Карточки заданий уже в кэше каталога
+        with self.assertNumQueries(TASKS_PAGE_CACHED_QUERIES):
+            self.client.get('/api/tasks/')
+
+
+class FirebaseSetupTest(TestCase):
+    def test_startup_does_not_set_up_firebase(self):
+        # Отдельный процесс: в текущем firebase_admin мог загрузить
+        # другой тест
+        result = subprocess.run(
+            [
+                sys.executable, '-c',
+                'import sys\n'
+                'from slife.wsgi import application\n'
+                'from api import firebase\n'
+                'print("firebase_admin" in sys.modules, firebase._app)'
+            ],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'slife.settings'}
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['False', 'None'])
+
+    @override_settings(FIREBASE_CREDENTIALS_PATH='/nonexistent/key.json')
+    def test_missing_credentials_are_tolerated(self):
+        with mock.patch('api.firebase._app', None), self.assertLogs(
+            'api.firebase', 'WARNING'
+        ):
+            self.assertIsNone(get_firebase_app())
+            self.assertEqual(
+                FirebaseTransport().send_multicast(
+                    ['token'], 'Заголовок', 'Текст', {}
+                ),
+                []
+            )
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user@slife.local')
+        cls.staff = User.objects.create_user(
+            'staff@slife.local', is_staff=True
+        )
+        cls.task = Task.objects.create(
+            title='Задание', slug='task', description='Описание',
+            short_description='Кратко'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    def test_requests_are_labeled_by_route(self):
+        self.client.force_authenticate(self.staff)
+        self.client.get(f'/api/tasks/{self.task.pk}/')
+        self.client.get('/api/no-such-page/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(
+            'slife_http_requests_total{method="GET",route="tasks-detail",'
+            'status="200"}',
+            content
+        )
+        self.assertIn(f'route="{UNRESOLVED_ROUTE}"', content)
+        # Идентификаторы объектов в метки не попадают
+        self.assertNotIn(f'/api/tasks/{self.task.pk}/', content)
+
+
+class RequestTimingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user@slife.local')
+        cls.staff = User.objects.create_user(
+            'staff@slife.local', is_staff=True
+        )
+
+    def get(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/users/me/')
+
+    def test_server_timing_is_sent_to_staff_only(self):
+        self.assertIn('db;dur=', self.get(self.staff)['Server-Timing'])
+        self.assertNotIn('Server-Timing', self.get(self.user))
+
+    def test_fast_request_is_logged_at_debug(self):
+        with self.assertLogs('api.timing', 'DEBUG') as logs:
+            self.get(self.user)
+        [record] = logs.records
+        self.assertEqual(record.levelname, 'DEBUG')
+        timing = json.loads(record.getMessage())
+        self.assertEqual(timing['user_id'], self.user.pk)
+        self.assertGreater(timing['queries'], 0)
+        self.assertNotIn('all_queries', timing)
+
+    def test_serialization_is_timed_without_patching_drf(self):
+        with self.assertLogs('api.timing', 'DEBUG') as logs:
+            self.get(self.user)
+        timing = json.loads(logs.records[0].getMessage())
+        self.assertGreater(timing['serializer_ms'], 0)
+        self.assertIs(
+            serializers.Serializer.__dict__['data'],
+            DRF_SERIALIZER_DATA
+        )
+
+    @override_settings(REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_request_is_logged_with_queries(self):
+        with self.assertLogs('api.timing', 'WARNING') as logs:
+            self.get(self.user)
+        timing = json.loads(logs.records[0].getMessage())
+        self.assertEqual(len(timing['all_queries']), timing['queries'])
+        self.assertIn('duplicates', timing)
+
+
+class AsyncViewsTest(TestCase):
+    """
+    Асинхронный ORM вне sync_to_async вызывает SynchronousOnlyOperation,
+    AsyncClient пробрасывает его в тест
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('async@slife.local')
+        category = CategoryTasks.objects.create(title='Спорт', slug='sport')
+        tasks = Task.objects.bulk_create(
+            Task(
+                title=f'Задание {i}', slug=f'task-{i}',
+                description='Описание', short_description='Кратко'
+            )
+            for i in range(30)
+        )
+        for task in tasks[::3]:
+            task.category.add(category)
+        # Одинаковое время создания проверяет порядок по id внутри курсора
+        created_at = tasks[0].created_at - timedelta(days=1)
+        Task.objects.filter(
+            pk__in=[task.pk for task in tasks[5:20]]
+        ).update(created_at=created_at)
+        UsersTasks.objects.create(task=tasks[0], initiator=cls.user)
+        cls.headers = {
+            'Authorization': f'JWT {AccessToken.for_user(cls.user)}'
+        }
+
+    def sync_get(self, url):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(url)
+
+    def sync_pages(self, url):
+        pages = []
+        while url:
+            page = self.sync_get(url).json()
+            pages.append([task['id'] for task in page['results']])
+            url = page['next']
+        return pages
+
+    async def async_pages(self, url):
+        pages = []
+        while url:
+            response = await self.async_client.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            pages.append([task['id'] for task in page['results']])
+            url = page['next']
+        return pages
+
+    async def test_task_pages_match_sync_endpoint(self):
+        for query in ('', '?category=sport'):
+            async_pages = await self.async_pages(f'/api/async/tasks/{query}')
+            sync_pages = await sync_to_async(self.sync_pages)(
+                f'/api/tasks/{query}'
+            )
+            self.assertEqual(async_pages, sync_pages)
+        # Из 10 заданий категории одно пользователь уже начал
+        self.assertEqual(len(sum(async_pages, [])), 9)
+
+    async def test_invalid_filter_is_rejected_like_sync_endpoint(self):
+        response = await self.async_client.get(
+            '/api/async/tasks/?category=%00', headers=self.headers
+        )
+        sync_response = await sync_to_async(self.sync_get)(
+            '/api/tasks/?category=%00'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), sync_response.json())
+
+    async def test_read_endpoints_run_without_sync_orm(self):
+        for path in (
+            '/api/async/categories/', '/api/async/user-tasks/',
+            '/api/async/users/me/',
+        ):
+            response = await self.async_client.get(path, headers=self.headers)
+            self.assertEqual(response.status_code, 200, path)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get('/api/async/tasks/')
+        self.assertEqual(response.status_code, 401)
+
+
+class HotQueryIndexTest(QueryPlanTestMixin, TestCase):
+    """Планы горячих запросов всех приложений на данных Seeder"""
+    @classmethod
+    def setUpTestData(cls):
+        Seeder(PLAN_SEED_VOLUMES, seed=1).seed()
+        cls.analyze()
+        cls.user = User.objects.filter(
+            subscribers_count__gt=0, authors_count__gt=0,
+            user_skills__isnull=False, initiated_tasks__isnull=False
+        ).first()
+        cls.post = Post.objects.filter(post_comments__isnull=False).first()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_user_tasks_list_uses_initiator_index(self):
+        self.assertEndpointUsesIndex(
+            self.client, '/api/user-tasks/', 'challenge_engine_userstasks',
+            'users_tasks_initiator_idx'
+        )
+
+    def test_available_tasks_use_user_task_index(self):
+        self.assertEndpointUsesIndex(
+            self.client, '/api/tasks/', 'challenge_engine_userstasks',
+            'unique_user_task', 'users_tasks_initiator_task_idx'
+        )
+
+    def test_tasks_to_confirm_use_target_index(self):
+        self.assertQuerysetUsesIndex(
+            UsersTasks.objects.filter(
+                target_user=self.user, status=TASK_STATUS_COMPLETED
+            ),
+            'users_tasks_target_status_idx'
+        )
+
+    def test_subscriptions_use_unique_subscription_index(self):
+        self.assertEndpointUsesIndex(
+            self.client, '/api/users/subscriptions/', 'user_service_subscribe',
+            'unique_subscription'
+        )
+
+    def test_subscribers_use_subscribing_index(self):
+        self.assertEndpointUsesIndex(
+            self.client, '/api/users/subscribers/', 'user_service_subscribe',
+            'subscribe_subscribing_idx'
+        )
+
+    def test_user_skills_use_user_level_index(self):
+        self.assertEndpointUsesIndex(
+            self.client, '/api/user-skills/', 'user_service_userskills',
+            'user_skills_user_level_idx'
+        )
+
+    def test_author_feed_uses_author_index(self):
+        self.assertQuerysetUsesIndex(
+            Post.objects.filter(author=self.post.author)[:20],
+            'post_author_pub_date_idx'
+        )
+
+    def test_published_feed_uses_published_index(self):
+        self.assertQuerysetUsesIndex(
+            Post.objects.filter(is_published=True)[:20],
+            'post_published_pub_date_idx'
+        )
+
+    def test_post_comments_use_post_index(self):
+        self.assertQuerysetUsesIndex(
+            Comment.objects.filter(post=self.post)[:20],
+            'comment_post_pub_date_idx'
+        )
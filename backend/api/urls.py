@@ -1,9 +1,10 @@
 from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
-    SlifeUserViewSet, UserSkillsViewSet,
-    TaskViewSet, CategoryTasksViewSet, UsersTasksViewSet,
+    SlifeUserViewSet, UserSkillsViewSet, LeaderboardViewSet,
+    TaskViewSet, CategoryTasksViewSet, UsersTasksViewSet, MetricsView,
 )
 
 app_name = 'api'
@@ -11,11 +12,31 @@ app_name = 'api'
 router = DefaultRouter()
 router.register('users', SlifeUserViewSet, basename='user')
 router.register('user-skills', UserSkillsViewSet, basename='user-skills')
+router.register('leaderboards', LeaderboardViewSet, basename='leaderboards')
 router.register('tasks', TaskViewSet, basename='tasks')
 router.register('categories', CategoryTasksViewSet, basename='categories')
 router.register('user-tasks', UsersTasksViewSet, basename='user-tasks')
 
 urlpatterns = [
     re_path(r'^auth/', include('djoser.urls.jwt')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
 ]
+
+# Асинхронные варианты эндпоинтов чтения, см. api/async_views.py
+urlpatterns += [
+    path('async/tasks/', async_views.task_list, name='async-tasks-list'),
+    path(
+        'async/tasks/<int:pk>/', async_views.task_detail,
+        name='async-tasks-detail'
+    ),
+    path(
+        'async/categories/', async_views.category_list,
+        name='async-categories-list'
+    ),
+    path(
+        'async/user-tasks/', async_views.user_task_list,
+        name='async-user-tasks-list'
+    ),
+    path('async/users/me/', async_views.user_me, name='async-user-me'),
+]
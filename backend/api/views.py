@@ -1,4 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from djoser.views import UserViewSet as DjoserUserViewSet
@@ -6,19 +9,35 @@ from rest_framework import status, serializers, viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.mixins import ListModelMixin
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
 from .serializers import (
     SlifeUserSerializer, UserSkillsSerializer, TaskFullSerializer,
     CategoryTasksSerializer, UsersTasksListSerializer, UsersTasksDetailSerializer,
-    TaskBriefSerializer
+    TaskBriefSerializer, SkillRankSerializer, BulkSubscribeSerializer,
+    UserSuggestionSerializer
 )
-from user_service.models import UserSkills, Subscribe
+from user_service.models import Skill, UserSkills, Subscribe
+from user_service.leaderboards import get_around, get_friends, get_top
+from user_service.skills import with_default_skills
+from user_service.subscriptions import SUBSCRIBED, subscribe_many
 from challenge_engine.models import (
     Task, CategoryTasks, UsersTasks,
     TASK_STATUS_STARTED, TASK_STATUS_COMPLETED,
     TASK_STATUS_CONFIRMED
 )
+from challenge_engine.catalog import get_catalog_version
+from challenge_engine.rewards import settle_rewards
+from challenge_engine.search import search_tasks
+from .caching import (
+    catalog_key, conditional_response, get_or_build, get_or_build_many,
+    make_etag
+)
+from .metrics import render_metrics
+from .notifications import notify_new_subscriptions, notify_task_confirmed
+from .pagination import SubscriptionCursorPagination, TaskCursorPagination
 from .permissions import IsAuthorOrAdmin
 from .filters import TaskFilter
 
@@ -32,6 +51,7 @@ ALREADY_SUBSCRIBED_ERROR = 'Вы уже подписаны на "{}"'
 TASK_ALREADY_STARTED = 'Вы уже начали выполнение этого задания'
 TASK_SELF_TARGET = 'Нельзя назначить себя целевым пользователем'
 TASK_USER_NOT_FOUND = 'Указанный пользователь не существует'
+TASK_INVALID_TARGET_USER = 'target_user должен быть id пользователя'
 TASK_NOT_STARTED = 'Задание должно быть в статусе "начато"'
 TASK_NOT_COMPLETED = 'Задание должно быть в статусе "завершено"'
 TASK_ALREADY_CONFIRMED = 'Нельзя отменить подтвержденное задание'
@@ -40,8 +60,17 @@ TASK_WRONG_TARGET = 'Это задание предназначено для д
 TASK_CONFIRMATION_REQUIRED = 'Необходимо указать confirmation_id'
 TASK_NOT_FOUND = 'Задание не найдено'
 TASK_INVALID_RATING = 'Рейтинг должен быть числом от 1 до 5'
+TASK_SEARCH_QUERY_REQUIRED = 'Необходимо указать поисковый запрос q'
+
+# Параметры рейтингов навыков
+LEADERBOARD_DEFAULT_LIMIT = 50
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_DEFAULT_RADIUS = 5
+LEADERBOARD_MAX_RADIUS = 25
+LEADERBOARD_INVALID_PARAM = 'Параметр "{}" должен быть числом от 1 до {}'
 
 
+@transaction.atomic
 def create_mutual_subscriptions(user1, user2):
     """Создает взаимные подписки между двумя пользователями"""
     Subscribe.objects.get_or_create(user=user1, subscribing=user2)
@@ -50,24 +79,75 @@ def create_mutual_subscriptions(user1, user2):
 
 class SlifeUserViewSet(DjoserUserViewSet):
     """ViewSet для работы с пользователями"""
+    def get_queryset(self):
+        return super().get_queryset().with_profile_stats(self.request.user)
+
+    def get_instance(self):
+        if self.action == 'me' and self.request.method == 'GET':
+            return self.get_queryset().get(pk=self.request.user.pk)
+        return super().get_instance()
+
     @action(
-        ['get'], 
-        detail=False, 
+        ['get'],
+        detail=False,
         url_path='subscriptions',
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        pagination_class=SubscriptionCursorPagination
     )
     def subscriptions(self, request):
         """Получить список подписок пользователя"""
-        subscribe_data = SlifeUserSerializer(
-            self.filter_queryset(
-                self.get_queryset().filter(authors__user=request.user)
-            ),
+        return self._paginated_follow_list(
+            self.get_queryset().filter(authors__user=request.user).annotate(
+                subscription_id=F('authors__id')
+            )
+        )
+
+    @action(
+        ['get'],
+        detail=False,
+        url_path='subscribers',
+        permission_classes=[permissions.IsAuthenticated],
+        pagination_class=SubscriptionCursorPagination
+    )
+    def subscribers(self, request):
+        """Получить список подписчиков пользователя"""
+        return self._paginated_follow_list(
+            self.get_queryset().filter(
+                subscribers__subscribing=request.user
+            ).annotate(subscription_id=F('subscribers__id'))
+        )
+
+    @action(
+        ['get'],
+        detail=False,
+        url_path='suggestions',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def suggestions(self, request):
+        """
+        Рекомендации "возможно, вы знакомы" по числу общих подписок.
+        Рассчитываются заранее командой compute_suggestions.
+        """
+        page = self.paginate_queryset(
+            self.get_queryset().filter(
+                suggested_to__user=request.user
+            ).annotate(
+                mutual_count=F('suggested_to__score')
+            ).order_by('-mutual_count', 'suggested_to__candidate')
+        )
+        return self.get_paginated_response(UserSuggestionSerializer(
+            page,
             context={'request': request},
             many=True
-        ).data
-        return self.get_paginated_response(
-            self.paginate_queryset(subscribe_data)
-        )
+        ).data)
+
+    def _paginated_follow_list(self, queryset):
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        return self.get_paginated_response(SlifeUserSerializer(
+            page,
+            context={'request': self.request},
+            many=True
+        ).data)
 
     @action(
         ['post', 'delete'],
@@ -100,21 +180,110 @@ class SlifeUserViewSet(DjoserUserViewSet):
                 {'subscribe': ALREADY_SUBSCRIBED_ERROR.format(author)}
             )
 
+        # Перечитываем автора, чтобы аннотации учитывали новую подписку
         return Response(
             SlifeUserSerializer(
-                author,
+                self.get_queryset().get(pk=author.pk),
                 context={'request': request}
             ).data,
             status=status.HTTP_201_CREATED
         )
 
+    @action(
+        ['post'],
+        detail=False,
+        url_path='bulk-subscribe',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def bulk_subscribe(self, request):
+        """
+        Подписаться на список пользователей, например при импорте
+        контактов. Возвращает результат для каждого id.
+        """
+        serializer = BulkSubscribeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = subscribe_many(
+            request.user, serializer.validated_data['ids']
+        )
+        notify_new_subscriptions(request.user, [
+            author_id for author_id, result in results.items()
+            if result == SUBSCRIBED
+        ])
+        return Response({'results': [
+            {'id': author_id, 'status': result}
+            for author_id, result in results.items()
+        ]})
+
 
 class UserSkillsViewSet(ListModelMixin, GenericViewSet):
     """ViewSet для работы с навыками пользователя"""
     serializer_class = UserSkillsSerializer
 
     def get_queryset(self):
-        return UserSkills.objects.filter(user=self.request.user)
+        return UserSkills.objects.filter(
+            user=self.request.user
+        ).select_related('skill')
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(with_default_skills(
+            request.user, self.get_queryset(), Skill.objects.all()
+        ))
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+
+class LeaderboardViewSet(GenericViewSet):
+    """
+    Рейтинги пользователей по навыкам.
+    Читает снимки SkillRank, которые пересчитывает refresh_leaderboards.
+    """
+    queryset = Skill.objects.all()
+    serializer_class = SkillRankSerializer
+
+    def retrieve(self, request, pk=None):
+        """Первые limit мест рейтинга навыка"""
+        return self._ranks_response(get_top(
+            self.get_object().pk,
+            self._int_param(
+                'limit', LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT
+            )
+        ))
+
+    @action(detail=True, url_path='around-me')
+    def around_me(self, request, pk=None):
+        """Место пользователя и radius соседей выше и ниже"""
+        return self._ranks_response(get_around(
+            self.get_object().pk,
+            request.user,
+            self._int_param(
+                'radius', LEADERBOARD_DEFAULT_RADIUS, LEADERBOARD_MAX_RADIUS
+            )
+        ))
+
+    @action(detail=True)
+    def friends(self, request, pk=None):
+        """Рейтинг среди пользователя и его подписок"""
+        return self._ranks_response(get_friends(
+            self.get_object().pk,
+            request.user,
+            self._int_param(
+                'limit', LEADERBOARD_DEFAULT_LIMIT, LEADERBOARD_MAX_LIMIT
+            )
+        ))
+
+    def _int_param(self, name, default, maximum):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        if not value.isdigit() or not 1 <= int(value) <= maximum:
+            raise serializers.ValidationError(
+                {name: LEADERBOARD_INVALID_PARAM.format(name, maximum)}
+            )
+        return int(value)
+
+    def _ranks_response(self, ranks):
+        return Response(self.get_serializer(ranks, many=True).data)
 
 
 class TaskViewSet(viewsets.ReadOnlyModelViewSet):
@@ -122,6 +291,7 @@ class TaskViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskFullSerializer
     filterset_class = TaskFilter
+    pagination_class = TaskCursorPagination
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -129,69 +299,158 @@ class TaskViewSet(viewsets.ReadOnlyModelViewSet):
         return TaskFullSerializer
 
     def get_queryset(self):
-        queryset = Task.objects.all()
-        
-        started_tasks = UsersTasks.objects.filter(
-            initiator=self.request.user,
-            status__in=[
-                TASK_STATUS_STARTED,
-                TASK_STATUS_COMPLETED,
-                TASK_STATUS_CONFIRMED
-            ]
-        ).values_list('task_id', flat=True)
-        
-        return queryset.exclude(id__in=started_tasks)
+        if self.action != 'start':
+            return Task.objects.available_for(self.request.user)
+        # Уже начатое задание не скрывается: повторный старт получает
+        # ошибку TASK_ALREADY_STARTED от ограничения unique_user_task
+        # Награды и категории нужны ответу, имя целевого пользователя
+        # читается в том же запросе, что и задание
+        queryset = Task.objects.with_rewards()
+        target_user = self.get_target_user_id()
+        if target_user:
+            queryset = queryset.annotate(target_username=Subquery(
+                User.objects.filter(id=target_user).values('username')[:1]
+            ))
+        return queryset
+
+    def get_target_user_id(self):
+        """id целевого пользователя из тела запроса или None"""
+        target_user = self.request.data.get('target_user')
+        if not target_user:
+            return None
+        try:
+            return serializers.IntegerField(min_value=1).run_validation(
+                target_user
+            )
+        except serializers.ValidationError:
+            raise serializers.ValidationError(
+                {'error': TASK_INVALID_TARGET_USER}
+            )
 
-    @action(detail=True, methods=['post'])
-    def start(self, request, pk=None):
-        """Начать выполнение задания"""
-        task = self.get_object()
-        
-        # Проверяем, не начато ли уже это задание пользователем
-        if UsersTasks.objects.filter(
-            task=task,
-            initiator=request.user
-        ).exists():
+    def list(self, request, *args, **kwargs):
+        """
+        Список доступных заданий.
+        Идентификаторы страницы выбираются запросом с учетом пользователя,
+        карточки заданий берутся из общего кэша каталога.
+        """
+        version = get_catalog_version()
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values('id', 'created_at')
+        )
+        ids = [row['id'] for row in page]
+        return conditional_response(
+            request,
+            make_etag(version, request.get_full_path(), *ids),
+            lambda: self.get_paginated_response(
+                self._cached_tasks(version, ids, TaskBriefSerializer)
+            )
+        )
+
+    @action(detail=False, pagination_class=PageNumberPagination)
+    def search(self, request):
+        """
+        Полнотекстовый поиск по доступным заданиям (параметр q)
+        с учетом фильтра category, по убыванию релевантности.
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
             return Response(
-                {'error': TASK_ALREADY_STARTED},
+                {'error': TASK_SEARCH_QUERY_REQUIRED},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        version = get_catalog_version()
+        page = self.paginate_queryset(search_tasks(
+            self.filter_queryset(self.get_queryset()), text
+        ).values('id'))
+        ids = [row['id'] for row in page]
+        return conditional_response(
+            request,
+            make_etag(version, request.get_full_path(), *ids),
+            lambda: self.get_paginated_response(
+                self._cached_tasks(version, ids, TaskBriefSerializer)
+            )
+        )
 
+    def retrieve(self, request, *args, **kwargs):
+        version = get_catalog_version()
+        task_id = self.get_object().id
+        return conditional_response(
+            request,
+            make_etag(version, request.path, task_id),
+            lambda: Response(
+                self._cached_tasks(version, [task_id], TaskFullSerializer)[0]
+            )
+        )
+
+    def _cached_tasks(self, version, ids, serializer_class):
+        def build(missing_ids):
+            return {
+                data['id']: data for data in serializer_class(
+                    Task.objects.filter(id__in=missing_ids).with_rewards(),
+                    many=True
+                ).data
+            }
+
+        payloads = get_or_build_many(
+            {
+                catalog_key(version, serializer_class.__name__, task_id):
+                task_id for task_id in ids
+            },
+            build
+        )
+        return [payloads[task_id] for task_id in ids]
+
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """Начать выполнение задания"""
         # Получаем данные о целевом пользователе
-        target_user = request.data.get('target_user')
+        target_user = self.get_target_user_id()
         target_user_name = request.data.get('target_user_name', '')
 
         # Проверяем, что пользователь не назначает себя целевым
-        if target_user and str(target_user) == str(request.user.id):
+        if target_user == request.user.id:
             return Response(
                 {'error': TASK_SELF_TARGET},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Проверяем существование пользователя, если указан target_user
-        if target_user:
-            try:
-                User.objects.get(id=target_user)
-            except User.DoesNotExist:
-                return Response(
-                    {'error': TASK_USER_NOT_FOUND},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-        # Создаем новую запись в UsersTasks
-        user_task = UsersTasks.objects.create(
-            task=task,
-            initiator=request.user,
-            target_user_id=target_user,
-            target_user_name=target_user_name,
-            status=TASK_STATUS_STARTED,
-            started_at=timezone.now()
-        )
+        # Существование target_user проверяется в том же запросе
+        task = self.get_object()
+        if target_user and task.target_username is None:
+            return Response(
+                {'error': TASK_USER_NOT_FOUND},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Генерируем confirmation_id
-        user_task.confirmation_id = user_task.generate_confirmation_id()
-        user_task.save()
+        # Повторный старт отсекает ограничение unique_user_task
+        try:
+            with transaction.atomic():
+                user_task = UsersTasks.objects.create(
+                    task=task,
+                    initiator=request.user,
+                    target_user_id=target_user,
+                    target_user_name=target_user_name,
+                    status=TASK_STATUS_STARTED,
+                    started_at=timezone.now(),
+                    confirmation_id=UsersTasks.build_confirmation_id(
+                        task.id, request.user.id
+                    )
+                )
+        except IntegrityError:
+            # Прочие нарушения целостности не выдаются за повторный старт
+            if not UsersTasks.objects.filter(
+                task=task, initiator=request.user
+            ).exists():
+                raise
+            return Response(
+                {'error': TASK_ALREADY_STARTED},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        if target_user:
+            user_task.target_user = User(
+                id=target_user, username=task.target_username
+            )
         serializer = UsersTasksListSerializer(user_task)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -201,6 +460,26 @@ class CategoryTasksViewSet(ListModelMixin, GenericViewSet):
     queryset = CategoryTasks.objects.all()
     serializer_class = CategoryTasksSerializer
 
+    def list(self, request, *args, **kwargs):
+        # Ключ строится только из номера страницы: прочие параметры
+        # запроса не порождают новых записей в кэше
+        page = request.query_params.get(
+            self.paginator.page_query_param, '1'
+        )
+        if not page.isdigit() and page not in self.paginator.last_page_strings:
+            return super().list(request, *args, **kwargs)
+        version = get_catalog_version()
+        return conditional_response(
+            request,
+            make_etag(version, 'categories', page),
+            lambda: Response(get_or_build(
+                catalog_key(version, 'categories', page),
+                lambda: super(CategoryTasksViewSet, self).list(
+                    request, *args, **kwargs
+                ).data
+            ))
+        )
+
 
 class UsersTasksViewSet(viewsets.ModelViewSet):
     """ViewSet для работы с заданиями пользователей"""
@@ -213,9 +492,13 @@ class UsersTasksViewSet(viewsets.ModelViewSet):
         return UsersTasksListSerializer
 
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return UsersTasks.objects.all()
-        return UsersTasks.objects.filter(initiator=self.request.user)
+        queryset = UsersTasks.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(initiator=self.request.user)
+        # Подгружаем связи только там, где ответ сериализует задание
+        if self.action in ('list', 'retrieve', 'complete'):
+            queryset = queryset.with_task_details()
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(initiator=self.request.user)
@@ -224,17 +507,17 @@ class UsersTasksViewSet(viewsets.ModelViewSet):
     def complete(self, request, pk=None):
         """Завершить задание"""
         task = self.get_object()
-        
-        if task.status != TASK_STATUS_STARTED:
+
+        if not task.transition(
+            TASK_STATUS_STARTED,
+            TASK_STATUS_COMPLETED,
+            completed_at=timezone.now()
+        ):
             return Response(
                 {'error': TASK_NOT_STARTED},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        task.status = TASK_STATUS_COMPLETED
-        task.completed_at = timezone.now()
-        task.save()
-        
+
         serializer = self.get_serializer(task)
         response_data = serializer.data
         response_data['confirmation_id'] = task.confirmation_id
@@ -256,7 +539,9 @@ class UsersTasksViewSet(viewsets.ModelViewSet):
 
         # Находим задание по confirmation_id
         try:
-            task = UsersTasks.objects.get(confirmation_id=confirmation_id)
+            task = UsersTasks.objects.with_task_details().select_related(
+                'initiator'
+            ).get(confirmation_id=confirmation_id)
         except UsersTasks.DoesNotExist:
             return Response(
                 {'error': TASK_NOT_FOUND},
@@ -270,13 +555,13 @@ class UsersTasksViewSet(viewsets.ModelViewSet):
             )
 
         # Проверяем, что пользователь не является инициатором
-        if task.initiator == request.user:
+        if task.initiator_id == request.user.id:
             return Response(
                 {'error': TASK_INITIATOR_CONFIRM},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if task.target_user and task.target_user != request.user:
+        if task.target_user_id and task.target_user_id != request.user.id:
             return Response(
                 {'error': TASK_WRONG_TARGET},
                 status=status.HTTP_403_FORBIDDEN
@@ -295,13 +580,25 @@ class UsersTasksViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-        task.status = TASK_STATUS_CONFIRMED
-        task.confirmed_at = timezone.now()
+        fields = {'confirmed_at': timezone.now()}
         if rating:
-            task.rating = rating
-        if not task.target_user:
-            task.target_user = request.user
-        task.save()
+            fields['rating'] = rating
+        if not task.target_user_id:
+            fields['target_user'] = request.user
+        # Из параллельных подтверждений выигрывает только одно.
+        # Награды начисляются в той же транзакции: подтвержденное задание
+        # не остается без наград при сбое между запросами
+        with transaction.atomic():
+            if not task.transition(
+                TASK_STATUS_COMPLETED, TASK_STATUS_CONFIRMED, **fields
+            ):
+                return Response(
+                    {'error': TASK_NOT_COMPLETED},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            settle_rewards([task.id])
+
+        notify_task_confirmed(task)
 
         # Создаем взаимные подписки между initiator и текущим пользователем
         create_mutual_subscriptions(request.user, task.initiator)
@@ -313,12 +610,19 @@ class UsersTasksViewSet(viewsets.ModelViewSet):
     def cancel(self, request, pk=None):
         """Отменить задание"""
         task = self.get_object()
-        
-        if task.status == TASK_STATUS_CONFIRMED:
+
+        if not task.cancel():
             return Response(
                 {'error': TASK_ALREADY_CONFIRMED},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        task.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    """Метрики запросов в текстовом формате Prometheus"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
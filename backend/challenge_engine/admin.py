@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 
 from .models import CategoryTasks, Task, TaskRewards, UsersTasks
+from .search import search_tasks
 
 
 @admin.register(CategoryTasks)
@@ -33,6 +34,12 @@ class TaskAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     inlines = [TaskRewardsInline]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо icontains по search_fields
+        if not search_term.strip():
+            return queryset, False
+        return search_tasks(queryset, search_term), False
+
     @admin.display(ordering='title', description='Название')
     def title_short(self, obj):
         return obj.title[:30] + '...' if len(obj.title) > 30 else obj.title
@@ -75,7 +82,9 @@ class UsersTasksAdmin(admin.ModelAdmin):
         'task__title', 'initiator__username', 'target_user__username'
     )
     raw_id_fields = ('task', 'initiator', 'target_user')
-    readonly_fields = ('started_at', 'completed_at', 'confirmed_at')
+    readonly_fields = (
+        'started_at', 'completed_at', 'confirmed_at', 'rewards_settled_at'
+    )
     ordering = ['-started_at']
 
     @admin.display(ordering='task__title', description='Задание')
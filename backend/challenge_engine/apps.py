@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ChallengeEngineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'challenge_engine'
     verbose_name = 'Челленджи'
+
+    def ready(self):
+        import challenge_engine.checks  # noqa
+        from challenge_engine.signals import restore_task_search
+
+        post_migrate.connect(restore_task_search, sender=self)
@@ -0,0 +1,55 @@
+"""
+Версия каталога заданий для кэширования ответов API.
+Ключи кэша включают номер версии, поэтому инвалидация — это
+инкремент версии, а не поиск и удаление старых записей.
+
+Версия видна всем процессам только в общем кэше (Redis, Memcached),
+см. checks.py. Сама версия живет не дольше CATALOG_CACHE_TIMEOUT,
+поэтому и без общего кэша устаревшие ответы и ETag ограничены этим
+сроком.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'challenge_engine:catalog-version'
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Начальное значение из часов: после вытеснения ключа из кэша
+        # версия не вернется к уже использованному номеру
+        cache.add(
+            CATALOG_VERSION_KEY, _initial_version(),
+            settings.CATALOG_CACHE_TIMEOUT
+        )
+        version = cache.get(CATALOG_VERSION_KEY, _initial_version())
+    return version
+
+
+async def aget_catalog_version():
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(
+            CATALOG_VERSION_KEY, _initial_version(),
+            settings.CATALOG_CACHE_TIMEOUT
+        )
+        version = await cache.aget(CATALOG_VERSION_KEY, _initial_version())
+    return version
+
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = _initial_version()
+        cache.set(
+            CATALOG_VERSION_KEY, version, settings.CATALOG_CACHE_TIMEOUT
+        )
+        return version
+
+
+def _initial_version():
+    return time.time_ns() // 1000
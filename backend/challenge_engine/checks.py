@@ -0,0 +1,25 @@
+"""Проверки настроек кэша каталога заданий"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCMEM_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_catalog_cache(app_configs, **kwargs):
+    """
+    Версия каталога хранится в кэше по умолчанию. В LocMemCache у каждого
+    воркера gunicorn своя копия, и изменения каталога видит только
+    воркер, обработавший запрос.
+    """
+    if settings.DEBUG:
+        return []
+    if settings.CACHES['default']['BACKEND'] == LOCMEM_CACHE_BACKEND:
+        return [Error(
+            'Кэш по умолчанию LocMemCache не общий для процессов: '
+            'версия каталога заданий не дойдет до других воркеров.',
+            hint='Задайте CACHE_BACKEND и CACHE_LOCATION общего кэша '
+                 '(Redis, Memcached).',
+            id='challenge_engine.E001',
+        )]
+    return []
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from challenge_engine.models import UsersTasks, TASK_STATUS_CONFIRMED
+from challenge_engine.rewards import settle_rewards
+
+
+class Command(BaseCommand):
+    help = 'Начисляет награды за подтвержденные задания без начислений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Количество заданий в одной транзакции'
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        settled = 0
+        last_id = 0
+        while True:
+            ids = list(
+                UsersTasks.objects.filter(
+                    pk__gt=last_id,
+                    status=TASK_STATUS_CONFIRMED,
+                    rewards_settled_at__isnull=True
+                ).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            settled += settle_rewards(ids)
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Начислены награды за заданий: {settled}'
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenge_engine', '0005_task_field_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', '-id'], name='task_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userstasks',
+            index=models.Index(fields=['initiator', 'task', 'status'], name='users_tasks_initiator_task_idx'),
+        ),
+    ]
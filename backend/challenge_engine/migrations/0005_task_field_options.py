@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Расхождения модели с миграциями, накопленные до 0005_task_catalog_indexes
+
+    dependencies = [
+        ('challenge_engine', '0004_remove_userstasks_invitation_token_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='categorytasks',
+            options={'ordering': ['title'], 'verbose_name': 'Категория задания', 'verbose_name_plural': 'Категории задания'},
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата создания'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='hint',
+            field=models.TextField(blank=True, help_text='Подсказка к заданию', verbose_name='Подсказка'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='short_description',
+            field=models.TextField(help_text='Краткое описание задания', verbose_name='Краткое описание'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AlterField(
+            model_name='userstasks',
+            name='confirmation_id',
+            field=models.CharField(blank=True, db_index=True, help_text='ID для подтверждения задания', max_length=64, null=True, unique=True, verbose_name='ID подтверждения'),
+        ),
+        migrations.AlterField(
+            model_name='userstasks',
+            name='status',
+            field=models.CharField(choices=[('started', 'начато'), ('completed', 'завершено'), ('confirmed', 'подтверждено'), ('canceled', 'отменено')], default='started', max_length=21, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:14
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_user_tasks(apps, schema_editor):
+    """
+    Оставляет по одной записи на пару (задание, инициатор) - последнюю
+    созданную, иначе ограничение unique_user_task не создастся
+    """
+    UsersTasks = apps.get_model('challenge_engine', 'UsersTasks')
+    UsersTasks.objects.exclude(pk__in=models.Subquery(
+        UsersTasks.objects.order_by().values('task', 'initiator').annotate(
+            newest_id=Max('pk')
+        ).values('newest_id')
+    )).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenge_engine', '0005_task_catalog_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_user_tasks, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='userstasks',
+            constraint=models.UniqueConstraint(fields=('task', 'initiator'), name='unique_user_task'),
+        ),
+    ]
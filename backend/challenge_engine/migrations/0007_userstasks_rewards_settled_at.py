@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenge_engine', '0006_unique_user_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstasks',
+            name='rewards_settled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата начисления наград'),
+        ),
+    ]
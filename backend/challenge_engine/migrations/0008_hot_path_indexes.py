@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from slife.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется в транзакции
+    atomic = False
+
+    dependencies = [
+        ('challenge_engine', '0007_userstasks_rewards_settled_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='userstasks',
+            index=models.Index(fields=['initiator', '-started_at'], name='users_tasks_initiator_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='userstasks',
+            index=models.Index(fields=['target_user', 'status'], name='users_tasks_target_status_idx'),
+        ),
+        # Одиночный индекс FK покрывается users_tasks_target_status_idx
+        migrations.AlterField(
+            model_name='userstasks',
+            name='target_user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='targeted_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Целевой пользователь'),
+        ),
+    ]
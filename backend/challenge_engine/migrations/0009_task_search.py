@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from challenge_engine.search import install_search_index, remove_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    remove_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется в транзакции
+    atomic = False
+
+    dependencies = [
+        ('challenge_engine', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        # Столбец и таблица FTS5 не описаны в модели Task,
+        # см. challenge_engine/search.py
+        migrations.RunPython(forwards, backwards, elidable=False),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-17 21:30
+
+import challenge_engine.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenge_engine', '0009_task_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSearchIndex',
+            fields=[
+                ('task', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='challenge_engine.task')),
+                ('document', challenge_engine.search.SearchDocumentField(db_column='challenge_engine_task_fts')),
+            ],
+            options={
+                'db_table': 'challenge_engine_task_fts',
+                'managed': False,
+            },
+        ),
+    ]
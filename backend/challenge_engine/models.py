@@ -1,10 +1,12 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
 import hashlib
 
 from user_service.models import Skill
+from .search import TASK_FTS_TABLE, SearchDocumentField
 
 User = get_user_model()
 
@@ -21,6 +23,13 @@ TASK_STATUSES = (
     (TASK_STATUS_CANCELED, 'отменено')
 )
 
+# Статусы, при которых задание больше не предлагается пользователю
+TASK_ACTIVE_STATUSES = (
+    TASK_STATUS_STARTED,
+    TASK_STATUS_COMPLETED,
+    TASK_STATUS_CONFIRMED
+)
+
 # Константы для сложности заданий
 TASK_DIFFICULTY_EASY = 'easy'
 TASK_DIFFICULTY_MEDIUM = 'medium'
@@ -49,6 +58,33 @@ class CategoryTasks(models.Model):
         return self.title[:21]
 
 
+class TaskQuerySet(models.QuerySet):
+    def available_for(self, user):
+        """
+        Задания, которые пользователь еще не начинал.
+        Коррелированный NOT EXISTS по индексу (initiator, task, status)
+        вместо растущего списка NOT IN.
+        """
+        return self.exclude(Exists(UsersTasks.objects.filter(
+            task=OuterRef('pk'),
+            initiator=user,
+            status__in=TASK_ACTIVE_STATUSES
+        )))
+
+    def with_rewards(self):
+        """
+        Подгружает награды с навыками и категории заданий
+        для TaskBriefSerializer/TaskFullSerializer двумя запросами.
+        """
+        return self.prefetch_related(
+            Prefetch(
+                'task_rewards',
+                queryset=TaskRewards.objects.select_related('reward')
+            ),
+            'category'
+        )
+
+
 class Task(models.Model):
     """Модель заданий"""
     title = models.CharField('Название', max_length=100)
@@ -86,15 +122,41 @@ class Task(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Задание'
         verbose_name_plural = 'Задания'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'], name='task_created_at_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class TaskSearchIndex(models.Model):
+    """
+    Таблица FTS5 поиска заданий на SQLite, создается миграцией
+    0009_task_search, см. challenge_engine.search
+    """
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index'
+    )
+    document = SearchDocumentField(db_column=TASK_FTS_TABLE)
+
+    class Meta:
+        managed = False
+        db_table = TASK_FTS_TABLE
+
+
 class TaskRewards(models.Model):
     """Модель наград за выполнение заданий"""
     task = models.ForeignKey(
@@ -133,6 +195,21 @@ class TaskRewards(models.Model):
         )
 
 
+class UsersTasksQuerySet(models.QuerySet):
+    def with_task_details(self):
+        """
+        Подгружает задание, целевого пользователя, награды и категории
+        для сериализаторов истории заданий за фиксированное число запросов.
+        """
+        return self.select_related('task', 'target_user').prefetch_related(
+            Prefetch(
+                'task__task_rewards',
+                queryset=TaskRewards.objects.select_related('reward')
+            ),
+            'task__category'
+        )
+
+
 class UsersTasks(models.Model):
     """Модель заданий пользователей"""
     task = models.ForeignKey(
@@ -153,7 +230,9 @@ class UsersTasks(models.Model):
         blank=True,
         null=True,
         related_name='targeted_tasks',
-        verbose_name='Целевой пользователь'
+        verbose_name='Целевой пользователь',
+        # Индекс заменен составным users_tasks_target_status_idx
+        db_index=False
     )
     target_user_name = models.CharField(
         'Имя целевого пользователя',
@@ -193,23 +272,81 @@ class UsersTasks(models.Model):
         blank=True,
         null=True
     )
+    rewards_settled_at = models.DateTimeField(
+        'Дата начисления наград',
+        blank=True,
+        null=True,
+        editable=False
+    )
+
+    objects = UsersTasksQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Задание пользователя'
         verbose_name_plural = 'Задания пользователей'
         ordering = ['-started_at']
+        constraints = [models.UniqueConstraint(
+            fields=['task', 'initiator'], name='unique_user_task'
+        )]
+        indexes = [
+            models.Index(
+                fields=['initiator', 'task', 'status'],
+                name='users_tasks_initiator_task_idx'
+            ),
+            models.Index(
+                fields=['initiator', '-started_at'],
+                name='users_tasks_initiator_idx'
+            ),
+            models.Index(
+                fields=['target_user', 'status'],
+                name='users_tasks_target_status_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.initiator} - {self.task}'
 
+    def transition(self, from_status, to_status, **fields):
+        """
+        Переводит задание из from_status в to_status одним
+        UPDATE ... WHERE id = ? AND status = ?.
+        Возвращает False, если статус уже изменил другой запрос.
+        """
+        updated = UsersTasks.objects.filter(
+            pk=self.pk, status=from_status
+        ).update(status=to_status, **fields)
+        if updated:
+            self.status = to_status
+            for name, value in fields.items():
+                setattr(self, name, value)
+        return bool(updated)
+
+    def cancel(self):
+        """
+        Удаляет неподтвержденное задание одним DELETE.
+        Возвращает False, если задание уже подтверждено.
+        """
+        deleted, _ = UsersTasks.objects.filter(pk=self.pk).exclude(
+            status=TASK_STATUS_CONFIRMED
+        ).delete()
+        return bool(deleted)
+
+    @staticmethod
+    def build_confirmation_id(task_id, initiator_id):
+        """
+        Вычисляет confirmation_id до вставки записи:
+        хэш от ID задания и инициатора
+        """
+        data = f"{task_id}:{initiator_id}".encode('utf-8')
+        return hashlib.sha256(data).hexdigest()[:32]
+
     def generate_confirmation_id(self):
-        """Генерирует confirmation_id как хэш от комбинации данных задания"""
+        """Сохраняет confirmation_id для записей, созданных без него"""
         if not self.confirmation_id:
-            # Создаем строку для хеширования из ID задания и инициатора
-            data = f"{self.task.id}:{self.initiator.id}".encode('utf-8')
-            # Генерируем хэш
-            self.confirmation_id = hashlib.sha256(data).hexdigest()[:32]
-            self.save()
+            self.confirmation_id = self.build_confirmation_id(
+                self.task_id, self.initiator_id
+            )
+            self.save(update_fields=['confirmation_id'])
         return self.confirmation_id
 
     def get_confirmation_url(self):
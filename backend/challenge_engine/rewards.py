@@ -0,0 +1,89 @@
+"""Начисление опыта навыков за подтвержденные задания"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from user_service.models import UserSkills
+from user_service.skills import (
+    DEFAULT_SKILL_EXPERIENCE, DEFAULT_SKILL_LEVEL,
+    level_for_experience_expression
+)
+from .models import TaskRewards, UsersTasks, TASK_STATUS_CONFIRMED
+
+
+def settle_rewards(user_task_ids):
+    """
+    Начисляет награды подтвержденных заданий их инициаторам.
+
+    Идемпотентно: задания помечаются rewards_settled_at в той же
+    транзакции, уже отмеченные и заблокированные другим процессом
+    пропускаются. Число запросов не зависит от количества заданий,
+    см. add_experience.
+    Возвращает количество обработанных заданий.
+    """
+    with transaction.atomic():
+        claimed = list(
+            UsersTasks.objects.select_for_update(skip_locked=True).filter(
+                pk__in=user_task_ids,
+                status=TASK_STATUS_CONFIRMED,
+                rewards_settled_at__isnull=True
+            ).values_list('pk', 'task_id', 'initiator_id')
+        )
+        if not claimed:
+            return 0
+        UsersTasks.objects.filter(
+            pk__in=[pk for pk, _, _ in claimed]
+        ).update(rewards_settled_at=timezone.now())
+
+        rewards = defaultdict(list)
+        for task_id, skill_id, quantity in TaskRewards.objects.filter(
+            task_id__in={task_id for _, task_id, _ in claimed}
+        ).values_list('task_id', 'reward_id', 'quantity'):
+            rewards[task_id].append((skill_id, quantity))
+
+        experience = defaultdict(int)
+        for _, task_id, user_id in claimed:
+            for skill_id, quantity in rewards[task_id]:
+                experience[user_id, skill_id] += quantity
+        add_experience(experience)
+    return len(claimed)
+
+
+def add_experience(experience):
+    """
+    Добавляет опыт {(user_id, skill_id): количество} и пересчитывает
+    уровни. Опыт добавляется одним UPDATE на каждую пару
+    (навык, количество), уровень пересчитывается из сохраненного опыта
+    одним UPDATE, поэтому размер запросов растет линейно.
+    Недостающие строки навыков создаются со значениями по умолчанию.
+    """
+    experience = {key: value for key, value in experience.items() if value}
+    if not experience:
+        return
+    UserSkills.objects.bulk_create(
+        [
+            UserSkills(
+                user_id=user_id,
+                skill_id=skill_id,
+                level=DEFAULT_SKILL_LEVEL,
+                experience=DEFAULT_SKILL_EXPERIENCE
+            )
+            for user_id, skill_id in experience
+        ],
+        ignore_conflicts=True
+    )
+    users = defaultdict(list)
+    for (user_id, skill_id), quantity in experience.items():
+        users[skill_id, quantity].append(user_id)
+    for (skill_id, quantity), user_ids in users.items():
+        UserSkills.objects.filter(
+            skill_id=skill_id, user_id__in=user_ids
+        ).update(experience=F('experience') + quantity)
+    # Лишние строки из произведения пользователей и навыков не меняются:
+    # уровень не понижается и уже соответствует их опыту
+    UserSkills.objects.filter(
+        user_id__in={user_id for user_id, _ in experience},
+        skill_id__in={skill_id for _, skill_id in experience}
+    ).update(level=level_for_experience_expression(F('experience')))
@@ -0,0 +1,188 @@
+"""
+Полнотекстовый поиск по заданиям: название, краткое описание и описание.
+
+На PostgreSQL используется генерируемый столбец search_vector
+(to_tsvector с конфигурацией russian и весами A/B/C) с GIN-индексом,
+на SQLite - внешняя таблица FTS5 challenge_engine_task_fts, которую
+поддерживают триггеры. Обе структуры создаются миграцией
+0009_task_search. Столбец search_vector в модели Task не описывается,
+поэтому условие строится через RawSQL, а таблица FTS5 описана
+неуправляемой моделью TaskSearchIndex, чтобы присоединять ее к заданиям.
+django.contrib.postgres не используется, так как он требует psycopg
+и на SQLite.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Lookup, TextField
+from django.db.models.expressions import RawSQL
+
+TASK_TABLE = 'challenge_engine_task'
+TASK_FTS_TABLE = 'challenge_engine_task_fts'
+SEARCH_CONFIG = 'russian'
+
+# Веса полей: название, краткое описание, описание
+SQLITE_BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+POSTGRES_MATCH = (
+    f'"{TASK_TABLE}"."search_vector" @@ '
+    f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+)
+POSTGRES_RANK = (
+    f'ts_rank_cd("{TASK_TABLE}"."search_vector", '
+    f"websearch_to_tsquery('{SEARCH_CONFIG}', %s))"
+)
+# bm25() тем меньше, чем лучше совпадение, поэтому берется с минусом
+SQLITE_RANK = (
+    f'-bm25({TASK_FTS_TABLE}, {", ".join(map(str, SQLITE_BM25_WEIGHTS))})'
+)
+
+
+class SearchDocumentField(TextField):
+    """Скрытый столбец таблицы FTS5 с ее именем, к нему применяется MATCH"""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def fts5_query(text):
+    """
+    Запрос FTS5 из слов text: все слова обязательны и ищутся по префиксу,
+    что частично заменяет отсутствующий в FTS5 русский стеммер.
+    Служебный синтаксис FTS5 в text не интерпретируется.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def search_tasks(queryset, text):
+    """
+    Задания queryset, подходящие под поисковый запрос text,
+    с аннотацией search_rank (чем больше, тем релевантнее),
+    по убыванию релевантности.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset = queryset.filter(
+            RawSQL(POSTGRES_MATCH, [text], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(POSTGRES_RANK, [text], output_field=FloatField())
+        )
+    else:
+        query = fts5_query(text)
+        if not query:
+            return queryset.none()
+        # bm25() доступен только в запросе с MATCH к самой таблице FTS5,
+        # поэтому она присоединяется к заданиям по rowid, а не читается
+        # коррелированным подзапросом на каждую найденную строку
+        queryset = queryset.filter(
+            search_index__document__match=query
+        ).annotate(
+            search_rank=RawSQL(SQLITE_RANK, [], output_field=FloatField())
+        )
+    return queryset.order_by('-search_rank', '-id')
+
+
+POSTGRES_INSTALL = (
+    f"""
+    ALTER TABLE {TASK_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')
+        || setweight(
+            to_tsvector('{SEARCH_CONFIG}', coalesce(short_description, '')),
+            'B'
+        )
+        || setweight(
+            to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C'
+        )
+    ) STORED
+    """,
+    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS task_search_vector_idx '
+    f'ON {TASK_TABLE} USING GIN (search_vector)',
+)
+POSTGRES_REMOVE = (
+    'DROP INDEX CONCURRENTLY IF EXISTS task_search_vector_idx',
+    f'ALTER TABLE {TASK_TABLE} DROP COLUMN IF EXISTS search_vector',
+)
+
+_FTS_COLUMNS = 'title, short_description, description'
+_FTS_NEW = 'new.title, new.short_description, new.description'
+_FTS_OLD = 'old.title, old.short_description, old.description'
+SQLITE_INSTALL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TASK_FTS_TABLE} USING fts5("
+    f"{_FTS_COLUMNS}, content='{TASK_TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {TASK_FTS_TABLE}_insert '
+    f'AFTER INSERT ON {TASK_TABLE} BEGIN '
+    f'INSERT INTO {TASK_FTS_TABLE}(rowid, {_FTS_COLUMNS}) '
+    f'VALUES (new.id, {_FTS_NEW}); END',
+    f'CREATE TRIGGER IF NOT EXISTS {TASK_FTS_TABLE}_delete '
+    f'AFTER DELETE ON {TASK_TABLE} BEGIN '
+    f'INSERT INTO {TASK_FTS_TABLE}({TASK_FTS_TABLE}, rowid, {_FTS_COLUMNS}) '
+    f"VALUES ('delete', old.id, {_FTS_OLD}); END",
+    f'CREATE TRIGGER IF NOT EXISTS {TASK_FTS_TABLE}_update '
+    f'AFTER UPDATE OF {_FTS_COLUMNS} ON {TASK_TABLE} BEGIN '
+    f'INSERT INTO {TASK_FTS_TABLE}({TASK_FTS_TABLE}, rowid, {_FTS_COLUMNS}) '
+    f"VALUES ('delete', old.id, {_FTS_OLD}); "
+    f'INSERT INTO {TASK_FTS_TABLE}(rowid, {_FTS_COLUMNS}) '
+    f'VALUES (new.id, {_FTS_NEW}); END',
+    f"INSERT INTO {TASK_FTS_TABLE}({TASK_FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_TRIGGERS = tuple(
+    f'{TASK_FTS_TABLE}_{event}' for event in ('insert', 'delete', 'update')
+)
+SQLITE_REMOVE = (
+    *(f'DROP TRIGGER IF EXISTS {trigger}' for trigger in SQLITE_TRIGGERS),
+    f'DROP TABLE IF EXISTS {TASK_FTS_TABLE}',
+)
+
+
+def install_search_index(schema_editor):
+    """
+    Создает поисковые структуры для СУБД соединения schema_editor.
+    Повторный вызов безопасен. На SQLite миграции, пересоздающие
+    таблицу заданий, удаляют триггеры, их восстанавливает
+    restore_search_index.
+    """
+    for statement in {
+        'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL
+    }.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def remove_search_index(schema_editor):
+    for statement in {
+        'postgresql': POSTGRES_REMOVE, 'sqlite': SQLITE_REMOVE
+    }.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def restore_search_index(using):
+    """
+    Заново создает триггеры FTS5 и перестраивает индекс, если их удалила
+    миграция, пересоздавшая таблицу заданий на SQLite.
+    Вызывается после migrate, см. ChallengeEngineConfig.
+    """
+    db = connections[using]
+    if (
+        db.vendor != 'sqlite'
+        or TASK_FTS_TABLE not in db.introspection.table_names()
+    ):
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'trigger' AND tbl_name = %s",
+            [TASK_TABLE]
+        )
+        if set(SQLITE_TRIGGERS) <= {row[0] for row in cursor.fetchall()}:
+            return
+        # Через курсор: schema_editor SQLite не работает внутри
+        # transaction.atomic()
+        for statement in SQLITE_INSTALL:
+            cursor.execute(statement)
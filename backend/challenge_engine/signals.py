@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from user_service.models import Skill
+from .catalog import bump_catalog_version
+from .models import CategoryTasks, Task, TaskRewards
+from .search import restore_search_index
+
+
+def invalidate_catalog(sender, action=None, **kwargs):
+    """
+    Сбрасывает кэш каталога после фиксации транзакции,
+    чтобы кэш не успел заполниться данными до коммита.
+    """
+    # m2m_changed вызывается дважды: pre_* и post_*
+    if action is None or action.startswith('post_'):
+        transaction.on_commit(bump_catalog_version)
+
+
+# Названия навыков отображаются в наградах заданий
+for model in (Task, TaskRewards, CategoryTasks, Skill):
+    post_save.connect(invalidate_catalog, sender=model)
+    post_delete.connect(invalidate_catalog, sender=model)
+m2m_changed.connect(invalidate_catalog, sender=Task.category.through)
+
+
+def restore_task_search(sender, using, **kwargs):
+    """Восстанавливает триггеры поиска по заданиям после migrate"""
+    restore_search_index(using)
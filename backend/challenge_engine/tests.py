@@ -1,3 +1,393 @@
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from user_service.models import Skill, UserSkills
+from user_service.skills import EXPERIENCE_CURVE, level_for_experience
+from .rewards import add_experience, settle_rewards
+from .search import (
+    SQLITE_TRIGGERS, TASK_TABLE, restore_search_index, search_tasks
+)
+from .models import (
+    CategoryTasks, Task, TaskRewards, UsersTasks, TASK_STATUS_COMPLETED,
+    TASK_STATUS_CONFIRMED, TASK_STATUS_STARTED
+)
+
+User = get_user_model()
+
+# count + страница + награды + категории
+USERS_TASKS_PAGE_QUERIES = 4
+# задание с именем целевого пользователя + награды + категории
+# + точка сохранения + INSERT + RELEASE
+START_TASK_QUERIES = 6
+# вставка строк навыков + 2 навыка x 2 количества + пересчет уровней
+ADD_EXPERIENCE_QUERIES = 6
+
+
+class UsersTasksQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('initiator@slife.local')
+        cls.target = User.objects.create_user('target@slife.local')
+        skills = Skill.objects.bulk_create(
+            Skill(title=f'Навык {i}') for i in range(2)
+        )
+        category = CategoryTasks.objects.create(title='Помощь', slug='help')
+        for i in range(12):
+            task = Task.objects.create(
+                title=f'Задание {i}',
+                slug=f'task-{i}',
+                description='Описание',
+                short_description='Кратко'
+            )
+            task.category.add(category)
+            for skill in skills:
+                TaskRewards.objects.create(
+                    task=task, reward=skill, quantity=i + 1
+                )
+            UsersTasks.objects.create(
+                task=task,
+                initiator=cls.user,
+                target_user=cls.target if i % 2 else None
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_page_has_fixed_query_budget(self):
+        with self.assertNumQueries(USERS_TASKS_PAGE_QUERIES):
+            response = self.client.get('/api/user-tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(
+            len(response.data['results'][0]['task']['rewards']), 2
+        )
+
+    def test_retrieve_does_not_load_relations_lazily(self):
+        user_task = UsersTasks.objects.filter(target_user=self.target).first()
+        user_task.generate_confirmation_id()
+        # задание + награды + категории
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/user-tasks/{user_task.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data['target_user_info'], self.target.username
+        )
+
+
+class UsersTasksTransitionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('initiator@slife.local')
+        cls.target = User.objects.create_user('target@slife.local')
+        cls.task = Task.objects.create(
+            title='Задание', slug='task', description='Описание',
+            short_description='Кратко'
+        )
+
+    def setUp(self):
+        self.user_task = UsersTasks.objects.create(
+            task=self.task, initiator=self.user, target_user=self.target
+        )
+        self.user_task.generate_confirmation_id()
+        self.client = APIClient()
+
+    def moved_on(self, status):
+        """
+        Подменяет transition так, что перед UPDATE статус меняет
+        параллельный запрос: проверки представления уже пройдены
+        """
+        transition = UsersTasks.transition
+
+        def concurrent_transition(user_task, *args, **kwargs):
+            UsersTasks.objects.filter(pk=user_task.pk).update(status=status)
+            return transition(user_task, *args, **kwargs)
+
+        return mock.patch.object(
+            UsersTasks, 'transition', concurrent_transition
+        )
+
+    def test_stale_transition_writes_nothing(self):
+        stale = UsersTasks.objects.get(pk=self.user_task.pk)
+        self.assertTrue(self.user_task.transition(
+            TASK_STATUS_STARTED, TASK_STATUS_COMPLETED, rating=5
+        ))
+        self.assertFalse(stale.transition(
+            TASK_STATUS_STARTED, TASK_STATUS_CONFIRMED, rating=1
+        ))
+        self.assertEqual(stale.status, TASK_STATUS_STARTED)
+        self.user_task.refresh_from_db()
+        self.assertEqual(self.user_task.status, TASK_STATUS_COMPLETED)
+        self.assertEqual(self.user_task.rating, 5)
+
+    def test_cancel_keeps_confirmed_task(self):
+        self.user_task.transition(TASK_STATUS_STARTED, TASK_STATUS_CONFIRMED)
+        self.assertFalse(self.user_task.cancel())
+        self.assertTrue(
+            UsersTasks.objects.filter(pk=self.user_task.pk).exists()
+        )
+
+    def test_complete_rejects_moved_on_status(self):
+        self.client.force_authenticate(self.user)
+        with self.moved_on(TASK_STATUS_COMPLETED):
+            response = self.client.post(
+                f'/api/user-tasks/{self.user_task.pk}/complete/'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.user_task.refresh_from_db()
+        self.assertIsNone(self.user_task.completed_at)
+
+    def test_confirm_rejects_moved_on_status(self):
+        self.user_task.transition(TASK_STATUS_STARTED, TASK_STATUS_COMPLETED)
+        self.client.force_authenticate(self.target)
+        with self.moved_on(TASK_STATUS_CONFIRMED):
+            response = self.client.post(
+                '/api/user-tasks/confirm_by_id/',
+                {'confirmation_id': self.user_task.confirmation_id}
+            )
+        self.assertEqual(response.status_code, 400)
+        self.user_task.refresh_from_db()
+        self.assertIsNone(self.user_task.confirmed_at)
+
+    def test_second_start_is_rejected(self):
+        task = Task.objects.create(
+            title='Новое задание', slug='new-task', description='Описание',
+            short_description='Кратко'
+        )
+        self.client.force_authenticate(self.user)
+        first = self.client.post(f'/api/tasks/{task.pk}/start/')
+        second = self.client.post(f'/api/tasks/{task.pk}/start/')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(
+            UsersTasks.objects.filter(task=task, initiator=self.user).count(),
+            1
+        )
+
+    def test_start_reads_task_once(self):
+        task = Task.objects.create(
+            title='Новое задание', slug='new-task', description='Описание',
+            short_description='Кратко'
+        )
+        TaskRewards.objects.create(
+            task=task, reward=Skill.objects.create(title='Сила'), quantity=10
+        )
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(START_TASK_QUERIES):
+            response = self.client.post(
+                f'/api/tasks/{task.pk}/start/',
+                {'target_user': self.target.pk}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            response.data['target_user_info'], self.target.username
+        )
+        self.assertEqual(len(response.data['task']['rewards']), 1)
+
+    def test_start_validates_target_user(self):
+        self.client.force_authenticate(self.user)
+        path = f'/api/tasks/{self.user_task.task_id}/start/'
+        for target_user in ('abc', '1.5', -1, 10 ** 6):
+            response = self.client.post(path, {'target_user': target_user})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.data)
+
+    def test_start_reraises_other_integrity_errors(self):
+        task = Task.objects.create(
+            title='Новое задание', slug='new-task', description='Описание',
+            short_description='Кратко'
+        )
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(
+            UsersTasks.objects, 'create', side_effect=IntegrityError
+        ), self.assertRaises(IntegrityError):
+            self.client.post(f'/api/tasks/{task.pk}/start/')
+
+    def test_cancel_rejects_confirmed_task(self):
+        self.client.force_authenticate(self.user)
+        self.user_task.transition(TASK_STATUS_STARTED, TASK_STATUS_CONFIRMED)
+        response = self.client.post(
+            f'/api/user-tasks/{self.user_task.pk}/cancel/'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(
+            UsersTasks.objects.filter(pk=self.user_task.pk).exists()
+        )
+
+
+class RewardsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('initiator@slife.local')
+        cls.target = User.objects.create_user('target@slife.local')
+        cls.skill = Skill.objects.create(title='Доброта')
+        cls.task = Task.objects.create(
+            title='Задание', slug='task', description='Описание',
+            short_description='Кратко'
+        )
+        TaskRewards.objects.create(
+            task=cls.task, reward=cls.skill, quantity=150
+        )
+
+    def setUp(self):
+        self.user_task = UsersTasks.objects.create(
+            task=self.task, initiator=self.user, target_user=self.target,
+            status=TASK_STATUS_COMPLETED
+        )
+        self.user_task.generate_confirmation_id()
+        self.client = APIClient()
+        self.client.force_authenticate(self.target)
+
+    def skill_progress(self):
+        user_skill = UserSkills.objects.get(user=self.user, skill=self.skill)
+        return user_skill.level, user_skill.experience
+
+    def confirm(self):
+        return self.client.post(
+            '/api/user-tasks/confirm_by_id/',
+            {'confirmation_id': self.user_task.confirmation_id}
+        )
+
+    def test_confirmation_settles_rewards_once(self):
+        self.assertEqual(self.confirm().status_code, 200)
+        self.assertEqual(self.skill_progress(), (2, 150))
+        self.assertEqual(self.confirm().status_code, 400)
+        self.assertEqual(settle_rewards([self.user_task.pk]), 0)
+        self.assertEqual(self.skill_progress(), (2, 150))
+
+    def test_failed_settlement_keeps_task_completed(self):
+        with mock.patch(
+            'api.views.settle_rewards', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.confirm()
+        self.user_task.refresh_from_db()
+        self.assertEqual(self.user_task.status, TASK_STATUS_COMPLETED)
+        self.assertIsNone(self.user_task.rewards_settled_at)
+
+    def test_level_follows_experience_curve_boundaries(self):
+        for level, threshold in enumerate(EXPERIENCE_CURVE[1:4], start=2):
+            self.assertEqual(level_for_experience(threshold - 1), level - 1)
+            self.assertEqual(level_for_experience(threshold), level)
+        key = (self.user.pk, self.skill.pk)
+        for gained, progress in (
+            (EXPERIENCE_CURVE[1] - 1, (1, 99)),
+            (1, (2, 100)),
+            (EXPERIENCE_CURVE[3] - 100, (4, 600)),
+            (EXPERIENCE_CURVE[4] - 601, (4, 999)),
+        ):
+            add_experience({key: gained})
+            self.assertEqual(self.skill_progress(), progress)
+
+
+    def test_statement_size_is_linear_in_pairs(self):
+        users = [
+            User.objects.create_user(f'rewarded-{i}@slife.local')
+            for i in range(40)
+        ]
+        skills = [self.skill, Skill.objects.create(title='Смелость')]
+        experience = {
+            (user.pk, skill.pk): 100 if user.pk % 2 else EXPERIENCE_CURVE[3]
+            for user in users for skill in skills
+        }
+        with CaptureQueriesContext(connection) as context:
+            add_experience(experience)
+        self.assertEqual(
+            len(context.captured_queries), ADD_EXPERIENCE_QUERIES
+        )
+        self.assertLess(
+            max(len(query['sql']) for query in context.captured_queries),
+            10000
+        )
+        for user_id, skill_id, level, gained in UserSkills.objects.filter(
+            user__in=users
+        ).values_list('user_id', 'skill_id', 'level', 'experience'):
+            self.assertEqual(gained, experience[user_id, skill_id])
+            self.assertEqual(level, level_for_experience(gained))
+
+
+class TaskSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher@slife.local')
+        cls.category = CategoryTasks.objects.create(
+            title='Спорт', slug='sport'
+        )
+        cls.in_title, cls.in_description, cls.other = (
+            Task.objects.create(
+                title=title, slug=slug, description=description,
+                short_description='Кратко'
+            )
+            for title, slug, description in (
+                ('Утренняя пробежка', 'run', 'Пробежка в парке'),
+                ('Зарядка', 'exercise', 'После зарядки пробежка'),
+                ('Шахматы', 'chess', 'Партия с другом'),
+            )
+        )
+        cls.in_description.category.add(cls.category)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get('/api/tasks/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [task['id'] for task in response.data['results']]
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(
+            self.search(q='пробежка'),
+            [self.in_title.id, self.in_description.id]
+        )
+
+    def test_search_combines_with_category_filter(self):
+        self.assertEqual(
+            self.search(q='пробежка', category='sport'),
+            [self.in_description.id]
+        )
+
+    def test_index_follows_task_updates(self):
+        self.other.description = 'Пробежка вокруг дома'
+        self.other.save()
+        self.assertIn(self.other.id, self.search(q='пробежка'))
+        self.in_title.delete()
+        self.assertNotIn(self.in_title.id, self.search(q='пробежка'))
+
+    def test_query_is_required(self):
+        response = self.client.get('/api/tasks/search/', {'q': ' '})
+        self.assertEqual(response.status_code, 400)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+    def test_fts_table_is_scanned_once(self):
+        plan = search_tasks(
+            Task.objects.filter(category=self.category), 'пробежка'
+        ).explain()
+        # MATCH выполняется один раз, задания читаются по первичному ключу
+        self.assertIn(
+            'SCAN challenge_engine_task_fts VIRTUAL TABLE INDEX 0:M',
+            plan.splitlines()[0]
+        )
 
-# Create your tests here.
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+    def test_triggers_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {SQLITE_TRIGGERS[0]}')
+            restore_search_index(connection.alias)
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = %s",
+                [TASK_TABLE]
+            )
+            self.assertEqual(
+                {row[0] for row in cursor.fetchall()}, set(SQLITE_TRIGGERS)
+            )
+        task = Task.objects.create(
+            title='Вечерняя пробежка', slug='evening-run',
+            description='Пробежка', short_description='Кратко'
+        )
+        self.assertIn(task.id, self.search(q='вечерняя'))
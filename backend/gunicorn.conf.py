@@ -0,0 +1,35 @@
+"""
+Настройки gunicorn, файл подхватывается при запуске из каталога backend:
+gunicorn slife.wsgi
+
+Если задан PROMETHEUS_MULTIPROC_DIR, каталог метрик очищается
+при старте мастера, а для завершенных воркеров вызывается
+mark_process_dead, см. api.metrics.
+"""
+import os
+
+from dotenv import load_dotenv
+
+# Переменные из .env нужны мастеру до запуска воркеров
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+
+
+def on_starting(server):
+    """Удаляет файлы метрик предыдущего запуска"""
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
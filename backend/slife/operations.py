@@ -0,0 +1,53 @@
+"""Операции миграций, общие для приложений проекта"""
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """
+    AddIndex, который на PostgreSQL выполняет CREATE INDEX CONCURRENTLY
+    и не блокирует запись в таблицу на время построения индекса.
+    На остальных СУБД работает как обычный AddIndex, поэтому миграции
+    применяются и в окружении с SQLITE=True.
+
+    CONCURRENTLY нельзя выполнять в транзакции: миграция с этой
+    операцией должна объявлять atomic = False.
+    Импорт django.contrib.postgres не используется, так как он требует
+    psycopg и на SQLite.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.add_index(model, self.index)
+            return
+        self._ensure_not_in_transaction(schema_editor)
+        schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.remove_index(model, self.index)
+            return
+        self._ensure_not_in_transaction(schema_editor)
+        schema_editor.remove_index(model, self.index, concurrently=True)
+
+    @staticmethod
+    def _ensure_not_in_transaction(schema_editor):
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                'AddIndexConcurrently нельзя выполнять в транзакции, '
+                'задайте atomic = False в миграции.'
+            )
+
+    def describe(self):
+        return (
+            f'Concurrently create index {self.index.name} '
+            f'on model {self.model_name}'
+        )
@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +84,21 @@ else:
     }
 
 
+# Для нескольких процессов нужен общий кэш (Redis, Memcached): в нем
+# хранится версия каталога заданий, по которой сбрасываются ответы API.
+# manage.py check --deploy сообщает об ошибке, если кэш LocMemCache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60 * 5))
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -127,7 +144,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -152,11 +169,58 @@ SIMPLE_JWT = {
 }
 
 
+# Копить изменения likes_count в таблице дельт и сбрасывать их пачками
+# командой flush_likes_counters вместо UPDATE строки поста на каждый лайк
+LIKES_WRITE_BEHIND = os.getenv('LIKES_WRITE_BEHIND', False) == 'True'
+
+
+# Кэш пользователей для api.authentication.CachedJWTAuthentication
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+AUTH_USER_CACHE_LOCAL_TTL = int(os.getenv('AUTH_USER_CACHE_LOCAL_TTL', 5))
+AUTH_USER_CACHE_LOCAL_SIZE = 1024
+
+
+# Замеры SQL и сериализации api.middleware.RequestTimingMiddleware.
+# Запросы дольше REQUEST_TIMING_SLOW_MS логируются со списком SQL
+# на уровне WARNING, остальные - на уровне DEBUG. Чтобы оставить
+# только медленные запросы, задайте REQUEST_TIMING_LOG_LEVEL=WARNING
+REQUEST_TIMING = os.getenv('REQUEST_TIMING', 'True') == 'True'
+REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', 500))
+
+# Метрики запросов для /api/metrics/, см. api.metrics.
+# Для нескольких воркеров задайте PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'DEBUG'),
+            'propagate': False,
+        },
+    },
+}
+
+
 VALID_CHARS_CODE = '0123456789'
 LENGTH_CODE = 6
 RESERVED_CODE = 'z' * LENGTH_CODE
 
 
+# Транспорт push-уведомлений (api.notifications.FakeTransport для тестов)
+NOTIFICATIONS_TRANSPORT = os.getenv(
+    'NOTIFICATIONS_TRANSPORT', 'api.notifications.FirebaseTransport'
+)
+NOTIFICATIONS_MAX_WORKERS = int(os.getenv('NOTIFICATIONS_MAX_WORKERS', 4))
+# События сверх этого числа в очереди процесса отбрасываются
+NOTIFICATIONS_QUEUE_SIZE = int(os.getenv('NOTIFICATIONS_QUEUE_SIZE', 10000))
+
+
 FIREBASE_CREDENTIALS_PATH = os.path.join(
     BASE_DIR, 'config', 'firebase', 
     'slife-31e4a-firebase-adminsdk-fbsvc-d60e903e8f.json'
@@ -0,0 +1,93 @@
+"""Общие помощники тестов приложений проекта"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryPlanTestMixin:
+    """
+    Проверки плана запросов через EXPLAIN. Данные создает тест,
+    после их создания нужно вызвать analyze().
+    На PostgreSQL последовательное чтение запрещается на время теста:
+    на небольшой тестовой выборке планировщик иначе выбирает Seq Scan
+    даже при подходящем индексе.
+    """
+
+    @staticmethod
+    def analyze():
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def explain(self, sql):
+        # sql уже с подставленными параметрами (captured_queries)
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return '\n'.join(
+                ' '.join(map(str, row)) for row in cursor.fetchall()
+            )
+
+    @staticmethod
+    def plan_index_names(table, index_names):
+        """
+        Имена индексов index_names в том виде, в каком они выводятся
+        в плане. SQLite читает ограничения уникальности из CREATE TABLE
+        через индексы sqlite_autoindex_*, имя ограничения заменяется
+        именем такого индекса с теми же столбцами.
+        """
+        if connection.vendor != 'sqlite':
+            return index_names
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, table
+            )
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            autoindexes = {}
+            for _, name, _, origin, _ in cursor.fetchall():
+                if origin == 'u':
+                    cursor.execute(f'PRAGMA index_info("{name}")')
+                    columns = tuple(row[2] for row in cursor.fetchall())
+                    autoindexes[columns] = name
+        return tuple(
+            autoindexes.get(tuple(constraints[name]['columns']), name)
+            if name in constraints else name
+            for name in index_names
+        )
+
+    def assertQuerysetUsesIndex(self, queryset, *index_names):
+        index_names = self.plan_index_names(
+            queryset.model._meta.db_table, index_names
+        )
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f'Ни один из индексов {index_names} не используется:\n{plan}'
+        )
+
+    def assertEndpointUsesIndex(self, client, path, table, *index_names):
+        """
+        Хотя бы один запрос эндпоинта к table использует один из индексов
+        index_names
+        """
+        index_names = self.plan_index_names(table, index_names)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        plans = [
+            self.explain(query['sql'])
+            for query in context.captured_queries
+            if f'"{table}"' in query['sql']
+        ]
+        self.assertTrue(plans, f'{path} не обращается к {table}')
+        self.assertTrue(
+            any(
+                name in plan for plan in plans
+                for name in index_names
+            ),
+            f'{path}: индекс {index_names} не используется:\n'
+            + '\n\n'.join(plans)
+        )
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, When
+from django.db.models.functions import Greatest
+
+from .models import Comment, LikesCountDelta, Post
+
+
+def apply_likes_delta(model, pk, delta):
+    """
+    Изменяет likes_count объекта на delta.
+    По умолчанию атомарным UPDATE ... SET likes_count = likes_count + delta,
+    в режиме LIKES_WRITE_BEHIND — записью дельты для пакетного сброса.
+    """
+    if settings.LIKES_WRITE_BEHIND:
+        LikesCountDelta.objects.create(
+            **{f'{model._meta.model_name}_id': pk}, delta=delta
+        )
+        return
+    model.objects.filter(pk=pk).update(likes_count=Greatest(
+        F('likes_count') + delta, 0, output_field=IntegerField()
+    ))
+
+
+def flush_likes_deltas(batch_size=1000):
+    """
+    Сворачивает накопленные дельты в likes_count.
+    Каждая пачка — одна транзакция: суммирование по объектам,
+    один UPDATE на модель и удаление обработанных дельт.
+    Возвращает количество обработанных дельт.
+    """
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            # skip_locked позволяет запускать несколько сбросов параллельно
+            ids = list(LikesCountDelta.objects.select_for_update(
+                skip_locked=True
+            ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return flushed
+            batch = LikesCountDelta.objects.filter(pk__in=ids)
+            for model in (Post, Comment):
+                field = model._meta.model_name
+                totals = dict(
+                    batch.filter(**{f'{field}__isnull': False}).values(
+                        field
+                    ).annotate(total=Sum('delta')).values_list(field, 'total')
+                )
+                _apply_totals(model, totals)
+            flushed += batch.delete()[0]
+
+
+def _apply_totals(model, totals):
+    totals = {pk: total for pk, total in totals.items() if total}
+    if not totals:
+        return
+    model.objects.filter(pk__in=totals).update(likes_count=Case(
+        *(
+            When(pk=pk, then=Greatest(
+                F('likes_count') + total, 0, output_field=IntegerField()
+            ))
+            for pk, total in totals.items()
+        ),
+        default=F('likes_count'),
+        output_field=IntegerField()
+    ))
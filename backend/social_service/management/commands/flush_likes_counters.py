@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from social_service.counters import flush_likes_deltas
+
+
+class Command(BaseCommand):
+    help = (
+        'Сбрасывает накопленные изменения счетчиков лайков '
+        '(режим LIKES_WRITE_BEHIND)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество дельт в одной транзакции'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        flushed = flush_likes_deltas(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изменений: {flushed}'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_service', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LikesCountDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.SmallIntegerField(verbose_name='Изменение')),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='likes_deltas', to='social_service.comment', verbose_name='Комментарий')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='likes_deltas', to='social_service.post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Изменение счетчика лайков',
+                'verbose_name_plural': 'Изменения счетчиков лайков',
+            },
+        ),
+    ]
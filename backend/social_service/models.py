@@ -25,6 +25,16 @@ class Post(models.Model):
         ordering = '-pub_date',
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'], name='post_author_pub_date_idx'
+            ),
+            # Частичный индекс: лента читает только опубликованные посты
+            models.Index(
+                fields=['-pub_date'], condition=models.Q(is_published=True),
+                name='post_published_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'Пост {self.author} от {self.pub_date}'
@@ -50,6 +60,9 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = [models.Index(
+            fields=['post', '-pub_date'], name='comment_post_pub_date_idx'
+        )]
 
     def __str__(self):
         return f'Комментарий {self.author} к посту id={self.post.id}'
@@ -94,3 +107,31 @@ class CommentLike(Like):
 
     def __str__(self):
         return f'{self.user} лайкнул комментарий id={self.comment.id}'
+
+
+class LikesCountDelta(models.Model):
+    """
+    Отложенное изменение likes_count поста или комментария.
+    Используется в режиме LIKES_WRITE_BEHIND: лайки пишут сюда INSERT
+    без блокировки строки поста, команда flush_likes_counters
+    периодически сворачивает дельты в счетчики.
+    """
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, blank=True, null=True,
+        related_name='likes_deltas', verbose_name='Пост'
+    )
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, blank=True, null=True,
+        related_name='likes_deltas', verbose_name='Комментарий'
+    )
+    delta = models.SmallIntegerField('Изменение')
+
+    class Meta:
+        verbose_name = 'Изменение счетчика лайков'
+        verbose_name_plural = 'Изменения счетчиков лайков'
+
+    def __str__(self):
+        target = f'пост id={self.post_id}' if self.post_id else (
+            f'комментарий id={self.comment_id}'
+        )
+        return f'{target}: {self.delta:+d}'
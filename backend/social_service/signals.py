@@ -1,24 +1,34 @@
 from django.db.models.signals import post_save, post_delete
 
-from .models import PostLike, CommentLike
+from .counters import apply_likes_delta
+from .models import Post, Comment, PostLike, CommentLike
 
 
-def update_likes_count(sender, instance, **kwargs):
+def _liked_object(sender, instance):
+    if sender == PostLike:
+        return Post, instance.post_id
+    return Comment, instance.comment_id
+
+
+def like_created(sender, instance, created, **kwargs):
+    """Увеличивает likes_count связанного объекта (пост/комментарий)"""
+    if created:
+        apply_likes_delta(*_liked_object(sender, instance), 1)
+
+
+def like_deleted(sender, instance, origin=None, **kwargs):
     """
-    Обновляет поле likes_count у связанного объекта (пост/комментарий)
-    через полный пересчёт лайков.
+    Уменьшает likes_count связанного объекта (пост/комментарий).
+    При каскадном удалении самого поста или комментария счетчик не нужен.
     """
-    if sender == PostLike:
-        obj = instance.post
-    elif sender == CommentLike:
-        obj = instance.comment
-    obj.likes_count = obj.likes.count()
-    obj.save(update_fields=['likes_count'])
+    if isinstance(origin, (Post, Comment)):
+        return
+    apply_likes_delta(*_liked_object(sender, instance), -1)
 
 
 # Регистрируем сигналы для PostLike
-post_save.connect(update_likes_count, sender=PostLike)
-post_delete.connect(update_likes_count, sender=PostLike)
+post_save.connect(like_created, sender=PostLike)
+post_delete.connect(like_deleted, sender=PostLike)
 # Регистрируем сигналы для CommentLike
-post_save.connect(update_likes_count, sender=CommentLike)
-post_delete.connect(update_likes_count, sender=CommentLike)
\ No newline at end of file
+post_save.connect(like_created, sender=CommentLike)
+post_delete.connect(like_deleted, sender=CommentLike)
@@ -1,3 +1,60 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .counters import flush_likes_deltas
+from .models import Comment, CommentLike, LikesCountDelta, Post, PostLike
+
+User = get_user_model()
+
+
+class LikesCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author@slife.local')
+        cls.fans = [
+            User.objects.create_user(f'fan-{i}@slife.local') for i in range(3)
+        ]
+        cls.post = Post.objects.create(
+            author=cls.author, image='post.png', text='Пост'
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+
+    def like(self):
+        for fan in self.fans:
+            PostLike.objects.create(user=fan, post=self.post)
+            CommentLike.objects.create(user=fan, comment=self.comment)
+        PostLike.objects.filter(user=self.fans[0]).get().delete()
+
+    def likes_counts(self):
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        return self.post.likes_count, self.comment.likes_count
+
+    def test_likes_update_counters_immediately(self):
+        self.like()
+        self.assertEqual(self.likes_counts(), (2, 3))
+        self.assertFalse(LikesCountDelta.objects.exists())
+
+    @override_settings(LIKES_WRITE_BEHIND=True)
+    def test_write_behind_deltas_are_applied_once(self):
+        self.like()
+        self.assertEqual(self.likes_counts(), (0, 0))
+        self.assertEqual(LikesCountDelta.objects.count(), 7)
+        # Пачки меньше числа дельт: каждая дельта попадает ровно в одну
+        self.assertEqual(flush_likes_deltas(batch_size=2), 7)
+        self.assertEqual(self.likes_counts(), (2, 3))
+        self.assertFalse(LikesCountDelta.objects.exists())
+        call_command('flush_likes_counters', stdout=StringIO())
+        self.assertEqual(self.likes_counts(), (2, 3))
+
+    @override_settings(LIKES_WRITE_BEHIND=True)
+    def test_deltas_of_deleted_post_are_dropped(self):
+        self.like()
+        self.post.delete()
+        self.assertFalse(LikesCountDelta.objects.exists())
+        self.assertEqual(flush_likes_deltas(), 0)
@@ -6,7 +6,8 @@ from django.urls import reverse
 from django.utils.html import format_html
 
 from .models import (
-    Skill, SlifeUser, UserSkills, Subscribe, SELF_SUBSCRIBE_ERROR
+    Skill, SkillRank, SlifeUser, UserSkills, UserSuggestion, Subscribe,
+    SELF_SUBSCRIBE_ERROR
 )
 
 
@@ -37,12 +38,50 @@ class UserSkillsAdmin(admin.ModelAdmin):
         return obj.skill.title
 
 
+@admin.register(SkillRank)
+class SkillRankAdmin(admin.ModelAdmin):
+    list_display = (
+        'skill', 'rank', 'user', 'level', 'experience', 'refreshed_at'
+    )
+    list_filter = ('skill',)
+    search_fields = ('user__username',)
+    ordering = ('skill', 'rank')
+    list_select_related = ('skill', 'user')
+
+    # Снимки пересобираются командой refresh_leaderboards
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UserSuggestion)
+class UserSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'candidate', 'score')
+    search_fields = ('user__username', 'candidate__username')
+    ordering = ('user', '-score')
+    list_select_related = ('user', 'candidate')
+
+    # Рекомендации пересчитываются командой compute_suggestions
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(SlifeUser)
 class SlifeUserAdmin(UserAdmin):
-    list_display = ('username', 'email', 'date_joined', 'last_login')
+    list_display = (
+        'username', 'email', 'subscribers_count', 'authors_count',
+        'date_joined', 'last_login'
+    )
     list_filter = ('gender', 'is_active')
     search_fields = ('username', 'email', 'phone')
-    readonly_fields = ('confirmation_code',)
+    readonly_fields = (
+        'confirmation_code', 'subscribers_count', 'authors_count'
+    )
     fieldsets = (
         (None, {'fields': ('username', 'email', 'password')}),
         ('Персональные данные', {'fields': (
@@ -50,6 +89,7 @@ class SlifeUserAdmin(UserAdmin):
             'phone', 'avatar', 'birth_date', 'gender'
         )}),
         ('Роли', {'fields': ('is_superuser', 'is_staff', 'is_active')}),
+        ('Подписки', {'fields': ('subscribers_count', 'authors_count')}),
         ('Подтверждение', {'fields': ('confirmation_code',)}),
     )
     add_fieldsets = (
@@ -81,6 +121,12 @@ class SubscribeAdmin(admin.ModelAdmin):
             obj.subscribing.username[:21]
         )
 
+    def get_readonly_fields(self, request, obj=None):
+        # Счетчики ведутся по созданию/удалению, смена участников запрещена
+        if obj is not None:
+            return ('user', 'subscribing')
+        return super().get_readonly_fields(request, obj)
+
     def save_model(self, request, obj, form, change):
         if obj.user == obj.subscribing:
             raise ValidationError(SELF_SUBSCRIBE_ERROR)
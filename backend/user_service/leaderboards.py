@@ -0,0 +1,138 @@
+"""Рейтинги пользователей по навыкам"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+
+from .models import SkillRank, Subscribe, UserSkills
+from .skills import DEFAULT_SKILL_EXPERIENCE, DEFAULT_SKILL_LEVEL
+
+LEADERBOARD_BATCH_SIZE = 5000
+LEADERBOARD_TOTAL_KEY = 'user_service:leaderboard-total:{}'
+
+
+def refresh_skill_ranks(skill_id, batch_size=LEADERBOARD_BATCH_SIZE):
+    """
+    Пересобирает снимок рейтинга навыка.
+    Места считаются в БД оконной функцией RANK() по индексу
+    user_skills_ranking_idx, равные уровень и опыт дают одно место.
+    Старый снимок заменяется в одной транзакции, поэтому читатели
+    видят либо прежний, либо новый рейтинг целиком.
+    Возвращает количество пользователей в рейтинге.
+    """
+    refreshed_at = timezone.now()
+    ranked = UserSkills.objects.filter(skill_id=skill_id).annotate(
+        rank=Window(
+            Rank(), order_by=[F('level').desc(), F('experience').desc()]
+        )
+    ).order_by('rank', 'user_id').values_list(
+        'user_id', 'rank', 'level', 'experience'
+    )
+    total = 0
+    with transaction.atomic():
+        SkillRank.objects.filter(skill_id=skill_id).delete()
+        batch = []
+        for user_id, rank, level, experience in ranked.iterator(
+            chunk_size=batch_size
+        ):
+            batch.append(SkillRank(
+                skill_id=skill_id,
+                user_id=user_id,
+                rank=rank,
+                level=level,
+                experience=experience,
+                refreshed_at=refreshed_at
+            ))
+            if len(batch) >= batch_size:
+                SkillRank.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SkillRank.objects.bulk_create(batch)
+        total += len(batch)
+        transaction.on_commit(lambda: cache.set(
+            LEADERBOARD_TOTAL_KEY.format(skill_id), total, None
+        ))
+    return total
+
+
+def get_ranked_total(skill_id):
+    """Количество пользователей в снимке рейтинга навыка"""
+    key = LEADERBOARD_TOTAL_KEY.format(skill_id)
+    total = cache.get(key)
+    if total is None:
+        total = SkillRank.objects.filter(skill_id=skill_id).count()
+        cache.set(key, total, None)
+    return total
+
+
+def get_skill_rank(skill_id, user):
+    """
+    Место пользователя в рейтинге навыка.
+    Пользователь, которого еще нет в снимке (навык получен после
+    расчета или имеет значения по умолчанию), ставится перед первой
+    строкой снимка с не большим уровнем и опытом. Оба поиска идут
+    по индексу skill_rank_score_idx и не зависят от размера рейтинга.
+    Возвращает SkillRank, для отсутствующих в снимке - несохраненный.
+    """
+    snapshot = SkillRank.objects.filter(skill_id=skill_id)
+    skill_rank = snapshot.filter(user=user).first()
+    if skill_rank is not None:
+        # Пользователь уже загружен, сериализатор не читает его повторно
+        skill_rank.user = user
+        return skill_rank
+
+    user_skill = UserSkills.objects.filter(
+        user=user, skill_id=skill_id
+    ).values('level', 'experience').first() or {
+        'level': DEFAULT_SKILL_LEVEL,
+        'experience': DEFAULT_SKILL_EXPERIENCE
+    }
+    below = snapshot.filter(
+        level=user_skill['level'],
+        experience__lte=user_skill['experience']
+    ).order_by('-experience').values('rank').first() or snapshot.filter(
+        level__lt=user_skill['level']
+    ).order_by('-level', '-experience').values('rank').first()
+    return SkillRank(
+        skill_id=skill_id,
+        user=user,
+        rank=below['rank'] if below else get_ranked_total(skill_id) + 1,
+        **user_skill
+    )
+
+
+def get_top(skill_id, limit):
+    return list(SkillRank.objects.filter(
+        skill_id=skill_id
+    ).select_related('user').order_by('rank', 'user_id')[:limit])
+
+
+def get_around(skill_id, user, radius):
+    """
+    Соседи пользователя по рейтингу: radius строк выше и ниже.
+    Выборки идут от места пользователя по индексу skill_rank_position_idx.
+    """
+    skill_rank = get_skill_rank(skill_id, user)
+    neighbours = SkillRank.objects.filter(
+        skill_id=skill_id
+    ).exclude(user=user).select_related('user')
+    above = list(neighbours.filter(
+        rank__lt=skill_rank.rank
+    ).order_by('-rank', '-user_id')[:radius])
+    below = neighbours.filter(
+        rank__gte=skill_rank.rank
+    ).order_by('rank', 'user_id')[:radius]
+    return [*above[::-1], skill_rank, *below]
+
+
+def get_friends(skill_id, user, limit):
+    """
+    Рейтинг среди пользователя и тех, на кого он подписан.
+    Пользователи без строк в снимке в рейтинг не попадают.
+    """
+    return list(SkillRank.objects.filter(skill_id=skill_id).filter(
+        Q(user=user) | Q(user__in=Subscribe.objects.filter(
+            user=user
+        ).values('subscribing'))
+    ).select_related('user').order_by('rank', 'user_id')[:limit])
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from user_service.models import UserSkills
+from user_service.skills import (
+    DEFAULT_SKILL_EXPERIENCE, DEFAULT_SKILL_LEVEL
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет строки навыков со значениями по умолчанию: '
+        'они подставляются при чтении'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Количество строк в одном DELETE'
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        default_rows = UserSkills.objects.filter(
+            level=DEFAULT_SKILL_LEVEL, experience=DEFAULT_SKILL_EXPERIENCE
+        ).order_by('pk')
+        deleted = 0
+        last_id = 0
+        while True:
+            ids = list(default_rows.filter(pk__gt=last_id).values_list(
+                'pk', flat=True
+            )[:chunk_size])
+            if not ids:
+                break
+            # Условие повторяется: строка могла получить опыт после выборки
+            deleted += default_rows.filter(pk__in=ids).delete()[0]
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено строк навыков: {deleted}'
+        ))
@@ -0,0 +1,50 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from user_service.models import SlifeUser
+from user_service.suggestions import (
+    SUGGESTIONS_BATCH_SIZE, SUGGESTIONS_FAN_OUT, SUGGESTIONS_LIMIT,
+    refresh_stale_suggestions
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации "возможно, вы знакомы" для '
+        'пользователей, у которых изменились подписки. '
+        'Предназначена для запуска по расписанию'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать рекомендации всех пользователей'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=SUGGESTIONS_BATCH_SIZE,
+            help='Количество пользователей в одной пачке'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=SUGGESTIONS_LIMIT,
+            help='Количество сохраняемых рекомендаций на пользователя'
+        )
+        parser.add_argument(
+            '--fan-out', type=int, default=SUGGESTIONS_FAN_OUT,
+            help='Сколько подписок пользователя учитывать при расчете'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Зерно выборки подписок для воспроизводимого результата'
+        )
+
+    def handle(self, *args, batch_size, limit, fan_out, seed, **options):
+        if options['all']:
+            SlifeUser.objects.update(suggestions_stale=True)
+        users, suggestions = refresh_stale_suggestions(
+            batch_size, limit, fan_out, random.Random(seed)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны: пользователей {users}, '
+            f'рекомендаций {suggestions}'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from user_service.models import SlifeUser
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает разошедшиеся счетчики подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Количество пользователей в одном UPDATE'
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        fixed = 0
+        last_id = 0
+        while True:
+            ids = list(
+                SlifeUser.objects.filter(pk__gt=last_id).order_by(
+                    'pk'
+                ).values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            fixed += SlifeUser.objects.filter(
+                pk__in=ids
+            ).recompute_follow_counters()
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: {fixed}'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from user_service.leaderboards import (
+    LEADERBOARD_BATCH_SIZE, refresh_skill_ranks
+)
+from user_service.models import Skill
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает снимки рейтингов по навыкам. '
+        'Предназначена для запуска по расписанию'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skill', type=int, action='append', dest='skill_ids',
+            help='Пересчитать только указанные навыки (можно повторять)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=LEADERBOARD_BATCH_SIZE,
+            help='Количество строк рейтинга в одном INSERT'
+        )
+
+    def handle(self, *args, skill_ids, batch_size, **options):
+        skills = Skill.objects.order_by('pk')
+        if skill_ids:
+            skills = skills.filter(pk__in=skill_ids)
+        for skill_id, title in skills.values_list('pk', 'title'):
+            total = refresh_skill_ranks(skill_id, batch_size)
+            self.stdout.write(f'{title}: {total}')
+        self.stdout.write(self.style.SUCCESS('Рейтинги пересчитаны'))
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:09
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_follow_counters(apps, schema_editor):
+    SlifeUser = apps.get_model('user_service', 'SlifeUser')
+    Subscribe = apps.get_model('user_service', 'Subscribe')
+
+    def count_by(field):
+        return Coalesce(Subquery(
+            Subscribe.objects.filter(**{field: OuterRef('pk')}).order_by(
+            ).values(field).annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField()
+        ), 0)
+
+    SlifeUser.objects.update(
+        subscribers_count=count_by('user'),
+        authors_count=count_by('subscribing'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='userskills',
+            options={'ordering': ['-level', '-experience'], 'verbose_name': 'Навык пользователя', 'verbose_name_plural': 'Навыки пользователей'},
+        ),
+        migrations.AddField(
+            model_name='slifeuser',
+            name='authors_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='slifeuser',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписок'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userskills',
+            unique_together={('user', 'skill')},
+        ),
+        migrations.RunPython(
+            fill_follow_counters, migrations.RunPython.noop
+        ),
+    ]
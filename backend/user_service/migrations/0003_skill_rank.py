@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_service', '0002_slifeuser_follow_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(verbose_name='Место')),
+                ('level', models.PositiveIntegerField(verbose_name='Уровень')),
+                ('experience', models.PositiveIntegerField(verbose_name='Опыт')),
+                ('refreshed_at', models.DateTimeField(verbose_name='Дата расчета')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Рейтинги навыков',
+                'ordering': ['rank', 'user_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userskills',
+            index=models.Index(models.F('skill'), models.OrderBy(models.F('level'), descending=True), models.OrderBy(models.F('experience'), descending=True), name='user_skills_ranking_idx'),
+        ),
+        migrations.AddField(
+            model_name='skillrank',
+            name='skill',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranks', to='user_service.skill', verbose_name='Навык'),
+        ),
+        migrations.AddField(
+            model_name='skillrank',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_ranks', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='skillrank',
+            index=models.Index(fields=['skill', 'rank', 'user'], name='skill_rank_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skillrank',
+            index=models.Index(models.F('skill'), models.OrderBy(models.F('level'), descending=True), models.OrderBy(models.F('experience'), descending=True), name='skill_rank_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='skillrank',
+            constraint=models.UniqueConstraint(fields=('user', 'skill'), name='unique_skill_rank'),
+        ),
+    ]
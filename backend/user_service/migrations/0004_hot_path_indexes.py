@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from slife.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется в транзакции
+    atomic = False
+
+    dependencies = [
+        ('user_service', '0003_skill_rank'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='subscribe',
+            index=models.Index(fields=['subscribing', 'user'], name='subscribe_subscribing_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='userskills',
+            index=models.Index(fields=['user', '-level', '-experience'], name='user_skills_user_level_idx'),
+        ),
+        # Одиночный индекс FK покрывается subscribe_subscribing_idx
+        migrations.AlterField(
+            model_name='subscribe',
+            name='subscribing',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='authors', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-17 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from slife.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не выполняется в транзакции
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user_service', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(verbose_name='Общих подписок')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация',
+                'verbose_name_plural': 'Рекомендации',
+                'ordering': ['-score', 'candidate_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='slifeuser',
+            name='suggestions_stale',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Рекомендации устарели'),
+        ),
+        AddIndexConcurrently(
+            model_name='slifeuser',
+            index=models.Index(condition=models.Q(('suggestions_stale', True)), fields=['id'], name='user_suggestions_stale_idx'),
+        ),
+        migrations.AddField(
+            model_name='usersuggestion',
+            name='candidate',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggested_to', to=settings.AUTH_USER_MODEL, verbose_name='Кандидат'),
+        ),
+        migrations.AddField(
+            model_name='usersuggestion',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='usersuggestion',
+            index=models.Index(fields=['user', '-score', 'candidate'], name='user_suggestion_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='usersuggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'candidate'), name='unique_user_suggestion'),
+        ),
+    ]
@@ -1,11 +1,18 @@
 import random
+import re
+import uuid
 
 from django.conf import settings
 from django.contrib.auth import validators
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Count, Exists, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+)
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from django.utils.text import slugify
 
 
@@ -14,6 +21,23 @@ USERNAME_HELP_TEXT = ('Обязательное поле. Только букв
 
 SELF_SUBSCRIBE_ERROR = 'Нельзя подписаться на самого себя.'
 
+USERNAME_MAX_LENGTH = 30
+USERNAME_SUFFIX_DIGITS = 4
+USERNAME_SUFFIX_MAX_DIGITS = 8
+USERNAME_CREATE_ATTEMPTS = 5
+USERNAME_CANDIDATES_BATCH = 10
+# Сколько пачек кандидатов проверяется для одной длины суффикса
+USERNAME_CANDIDATE_BATCHES = 5
+# Поля, которые меняются только UPDATE с F()-выражениями. Полный save()
+# загруженного ранее пользователя их не перезаписывает
+DENORMALIZED_FIELDS = (
+    'subscribers_count', 'authors_count', 'suggestions_stale'
+)
+
+# Отправляется update_users() с аргументом user_ids: UPDATE в обход
+# save() не вызывает post_save, а копии строк нужно сбросить
+users_updated = Signal()
+
 
 class Skill(models.Model):
     title = models.CharField('Название', max_length=254, unique=True)
@@ -26,28 +50,139 @@ class Skill(models.Model):
         return self.title[:21]
 
 
-class SlifeUserManager(BaseUserManager):
+class SlifeUserQuerySet(models.QuerySet):
+    def with_profile_stats(self, viewer=None):
+        """
+        Аннотирует пользователей данными для SlifeUserSerializer:
+        признаком подписки viewer, счетчиками подписок и навыками.
+        Количество запросов не зависит от размера выборки.
+        """
+        if viewer is not None and viewer.is_authenticated:
+            is_subscribed = Exists(Subscribe.objects.filter(
+                user=viewer, subscribing=OuterRef('pk')
+            ))
+        else:
+            is_subscribed = Value(False)
+        return self.annotate(is_subscribed=is_subscribed).prefetch_related(
+            Prefetch(
+                'user_skills',
+                queryset=UserSkills.objects.select_related('skill')
+            )
+        )
+
+    def update_users(self, user_ids, **fields):
+        """
+        UPDATE пользователей user_ids с отправкой users_updated.
+        Используется вместо update() для записей в обход save().
+        """
+        user_ids = list(user_ids)
+        updated = self.filter(pk__in=user_ids).update(**fields)
+        users_updated.send(sender=self.model, user_ids=user_ids)
+        return updated
+
+    def recompute_follow_counters(self):
+        """
+        Пересчитывает разошедшиеся счетчики подписок: один SELECT
+        разошедшихся и UPDATE только при их наличии.
+        Возвращает количество исправленных пользователей.
+        """
+        subscribers_count = count_subquery(Subscribe, 'user')
+        authors_count = count_subquery(Subscribe, 'subscribing')
+        drifted = list(self.alias(
+            actual_subscribers_count=subscribers_count,
+            actual_authors_count=authors_count,
+        ).exclude(
+            subscribers_count=F('actual_subscribers_count'),
+            authors_count=F('actual_authors_count'),
+        ).values_list('pk', flat=True))
+        if drifted:
+            self.model.objects.update_users(
+                drifted,
+                subscribers_count=subscribers_count,
+                authors_count=authors_count,
+            )
+        return len(drifted)
+
+
+def count_subquery(model, field):
+    """
+    Коррелированный подзапрос COUNT(*) по внешнему ключу field.
+    Используется для сверки хранимых счетчиков с фактическими.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class SlifeUserManager(BaseUserManager.from_queryset(SlifeUserQuerySet)):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('Email должен быть указан')
 
         email = self.normalize_email(email)
-
-        # Генерация уникального username
-        if 'username' not in extra_fields:
-            base_username = slugify(email.split('@')[0])
-            unique_username = f'{base_username}{random.randint(0, 9999):04d}'
-
-            # Добавляем случайный суффикс, если username занят
-            while SlifeUser.objects.filter(username=unique_username).exists():
-                unique_username = f'{base_username}{random.randint(0, 9999):04d}'
-
-            extra_fields['username'] = unique_username
+        generate_username = 'username' not in extra_fields
+        base_username = slugify(email.split('@')[0])[
+            :USERNAME_MAX_LENGTH - USERNAME_SUFFIX_MAX_DIGITS
+        ]
 
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
-        user.save(using=self._db)
-        return user
+        for attempt in range(USERNAME_CREATE_ATTEMPTS):
+            # Генерация уникального username
+            if generate_username:
+                user.username = self.generate_username(base_username)
+            try:
+                with transaction.atomic(using=self._db):
+                    user.save(using=self._db)
+                return user
+            except IntegrityError:
+                # Повторяем, только если суффикс успел занять другой запрос
+                if not (
+                    generate_username
+                    and attempt + 1 < USERNAME_CREATE_ATTEMPTS
+                    and self.filter(username=user.username).exists()
+                ):
+                    raise
+
+    def generate_username(self, base_username):
+        """
+        Подбирает свободный username вида base + числовой суффикс.
+        Для каждой длины суффикса считается количество уже выданных
+        имен этого вида; если занята половина суффиксов, длина
+        увеличивается. Случайные кандидаты проверяются пачками
+        по USERNAME_CANDIDATES_BATCH одним запросом, занятые имена
+        в память не загружаются. Если свободное имя не нашлось
+        за USERNAME_CANDIDATE_BATCHES пачек ни для одной длины,
+        суффиксом становится начало uuid4.
+        """
+        for digits in range(
+            USERNAME_SUFFIX_DIGITS, USERNAME_SUFFIX_MAX_DIGITS + 1
+        ):
+            pattern = rf'^{re.escape(base_username)}[0-9]{{{digits}}}$'
+            generated = self.filter(
+                username__startswith=base_username, username__regex=pattern
+            )
+            if generated.count() * 2 >= 10 ** digits:
+                continue
+            for _ in range(USERNAME_CANDIDATE_BATCHES):
+                candidates = {
+                    base_username
+                    + f'{random.randrange(10 ** digits):0{digits}d}'
+                    for _ in range(USERNAME_CANDIDATES_BATCH)
+                }
+                free = candidates.difference(self.filter(
+                    username__in=candidates
+                ).values_list('username', flat=True))
+                if free:
+                    return free.pop()
+        # Совпадение маловероятно, его обрабатывает повтор в create_user
+        return base_username + uuid.uuid4().hex[:USERNAME_SUFFIX_MAX_DIGITS]
 
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
@@ -62,7 +197,7 @@ class SlifeUser(AbstractUser):
     ]
 
     username = models.CharField(
-        max_length=30,
+        max_length=USERNAME_MAX_LENGTH,
         unique=True,
         help_text=USERNAME_HELP_TEXT,
         validators=(validators.UnicodeUsernameValidator(),),
@@ -96,6 +231,17 @@ class SlifeUser(AbstractUser):
         max_length=settings.LENGTH_CODE,
         default=settings.RESERVED_CODE,
     )
+    # Денормализованные счетчики Subscribe, обновляются в signals.py
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписок', default=0, editable=False
+    )
+    authors_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
+    # Выставляется вместе со счетчиками, сбрасывается compute_suggestions
+    suggestions_stale = models.BooleanField(
+        'Рекомендации устарели', default=True, editable=False
+    )
 
     REQUIRED_FIELDS = []
     USERNAME_FIELD = 'email'
@@ -105,10 +251,31 @@ class SlifeUser(AbstractUser):
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [models.Index(
+            fields=['id'], condition=Q(suggestions_stale=True),
+            name='user_suggestions_stale_idx'
+        )]
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет пользователя без полей DENORMALIZED_FIELDS,
+        если они не перечислены в update_fields явно.
+        """
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class UserSkills(models.Model):
     user = models.ForeignKey(
@@ -129,6 +296,16 @@ class UserSkills(models.Model):
         verbose_name_plural = 'Навыки пользователей'
         unique_together = ['user', 'skill']
         ordering = ['-level', '-experience']
+        indexes = [
+            models.Index(
+                'skill', F('level').desc(), F('experience').desc(),
+                name='user_skills_ranking_idx'
+            ),
+            models.Index(
+                fields=['user', '-level', '-experience'],
+                name='user_skills_user_level_idx'
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -137,16 +314,90 @@ class UserSkills(models.Model):
         )
 
 
+class SkillRank(models.Model):
+    """
+    Снимок места пользователя в рейтинге навыка.
+    Пересобирается командой refresh_leaderboards, см. leaderboards.py.
+    """
+    skill = models.ForeignKey(
+        Skill, on_delete=models.CASCADE,
+        verbose_name='Навык', related_name='ranks'
+    )
+    user = models.ForeignKey(
+        SlifeUser, on_delete=models.CASCADE,
+        verbose_name='Пользователь', related_name='skill_ranks'
+    )
+    rank = models.PositiveIntegerField('Место')
+    level = models.PositiveIntegerField('Уровень')
+    experience = models.PositiveIntegerField('Опыт')
+    refreshed_at = models.DateTimeField('Дата расчета')
+
+    class Meta:
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Рейтинги навыков'
+        ordering = ['rank', 'user_id']
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'skill'], name='unique_skill_rank'
+        )]
+        indexes = [
+            models.Index(
+                fields=['skill', 'rank', 'user'],
+                name='skill_rank_position_idx'
+            ),
+            models.Index(
+                'skill', F('level').desc(), F('experience').desc(),
+                name='skill_rank_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.skill} #{self.rank}: {self.user}'
+
+
+class UserSuggestion(models.Model):
+    """
+    Рекомендация "возможно, вы знакомы": candidate, на которого подписаны
+    score пользователей из подписок user.
+    Пересчитывается командой compute_suggestions, см. suggestions.py.
+    """
+    user = models.ForeignKey(
+        SlifeUser, on_delete=models.CASCADE,
+        verbose_name='Пользователь', related_name='suggestions'
+    )
+    candidate = models.ForeignKey(
+        SlifeUser, on_delete=models.CASCADE,
+        verbose_name='Кандидат', related_name='suggested_to'
+    )
+    score = models.PositiveIntegerField('Общих подписок')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        ordering = ['-score', 'candidate_id']
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'candidate'], name='unique_user_suggestion'
+        )]
+        indexes = [models.Index(
+            fields=['user', '-score', 'candidate'],
+            name='user_suggestion_score_idx'
+        )]
+
+    def __str__(self):
+        return f'{self.user} -> {self.candidate} ({self.score})'
+
+
 class Subscribe(models.Model):
     user = models.ForeignKey(
         SlifeUser, on_delete=models.CASCADE,
         verbose_name='Пользователь',
         related_name='subscribers'
     )
+    # Индекс по автору заменен составным subscribe_subscribing_idx
     subscribing = models.ForeignKey(
         SlifeUser, on_delete=models.CASCADE,
         verbose_name='Автор',
-        related_name='authors'
+        related_name='authors',
+        db_index=False
     )
 
     class Meta:
@@ -155,6 +406,10 @@ class Subscribe(models.Model):
         constraints = [models.UniqueConstraint(
             fields=['user', 'subscribing'], name='unique_subscription'
         )]
+        # Подписки пользователя обслуживает unique_subscription
+        indexes = [models.Index(
+            fields=['subscribing', 'user'], name='subscribe_subscribing_idx'
+        )]
 
     def __str__(self):
         return (f'{self.user.username[:21]} подписан на '
@@ -1,22 +1,51 @@
-from django.db.models.signals import post_save
+from django.db.models import Case, F, IntegerField, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.shortcuts import get_object_or_404
 
-from .models import SlifeUser, UserSkills, Skill
+from .models import SlifeUser, Subscribe
+from .suggestions import forget_suggestions
 
 
-@receiver(post_save, sender=SlifeUser)
-def handle_new_user(sender, instance, created, **kwargs):
-    """Обработчик создания нового пользователя"""
+def shift_follow_counters(user_id, subscribing_id, delta):
+    """
+    Сдвигает счетчики подписок обоих участников на delta одним UPDATE.
+    Через F() без чтения строк, поэтому параллельные подписки не теряются.
+    Тем же UPDATE рекомендации обоих помечаются устаревшими.
+    """
+    SlifeUser.objects.update_users(
+        (user_id, subscribing_id),
+        subscribers_count=_shifted('subscribers_count', user_id, delta),
+        authors_count=_shifted('authors_count', subscribing_id, delta),
+        suggestions_stale=True,
+    )
+
+
+def _shifted(field, pk, delta):
+    return Case(
+        When(pk=pk, then=Greatest(
+            F(field) + delta, 0, output_field=IntegerField()
+        )),
+        default=F(field),
+        output_field=IntegerField()
+    )
+
+
+@receiver(post_save, sender=Subscribe)
+def handle_new_subscribe(sender, instance, created, **kwargs):
+    """
+    Увеличивает счетчики при создании подписки.
+    get_or_create() и админка выполняют сигнал в транзакции записи.
+    """
     if created:
-        # Присваиваем все существующие навыки с начальным уровнем
-        skills = [
-            UserSkills(
-                user=instance,
-                skill=skill,
-                level=1,
-                experience=0
-            )
-            for skill in Skill.objects.all()
-        ]
-        UserSkills.objects.bulk_create(skills)
+        shift_follow_counters(instance.user_id, instance.subscribing_id, 1)
+        forget_suggestions(instance.user_id, [instance.subscribing_id])
+
+
+@receiver(post_delete, sender=Subscribe)
+def handle_delete_subscribe(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики при удалении подписки.
+    Collector.delete() вызывает post_delete внутри своей транзакции.
+    """
+    shift_follow_counters(instance.user_id, instance.subscribing_id, -1)
@@ -0,0 +1,70 @@
+"""Кривая опыта навыков и вычисление уровня по опыту"""
+from bisect import bisect_right
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .models import UserSkills
+
+DEFAULT_SKILL_LEVEL = 1
+DEFAULT_SKILL_EXPERIENCE = 0
+
+MAX_SKILL_LEVEL = 50
+
+# Опыт, необходимый для достижения уровня: EXPERIENCE_CURVE[level - 1].
+# Каждый следующий уровень требует на 100 опыта больше предыдущего.
+EXPERIENCE_CURVE = tuple(
+    50 * level * (level - 1) for level in range(1, MAX_SKILL_LEVEL + 1)
+)
+
+
+def with_default_skills(user, user_skills, skills):
+    """
+    Дополняет сохраненные навыки пользователя навыками по умолчанию.
+    Строка UserSkills создается только при первом получении опыта,
+    отсутствующие навыки возвращаются несохраненными объектами
+    с начальным уровнем. Порядок как у UserSkills.Meta.ordering.
+    """
+    merged = {user_skill.skill_id: user_skill for user_skill in user_skills}
+    for skill in skills:
+        if skill.id not in merged:
+            merged[skill.id] = UserSkills(
+                user=user,
+                skill=skill,
+                level=DEFAULT_SKILL_LEVEL,
+                experience=DEFAULT_SKILL_EXPERIENCE
+            )
+    return sorted(
+        merged.values(),
+        key=lambda item: (-item.level, -item.experience, item.skill_id)
+    )
+
+
+def level_for_experience(experience):
+    return bisect_right(EXPERIENCE_CURVE, experience)
+
+
+def level_for_experience_expression(experience):
+    """
+    SQL-выражение уровня для опыта experience по EXPERIENCE_CURVE.
+    Позволяет пересчитать уровень в том же UPDATE, что и опыт,
+    не читая строки навыков. Уровень не понижается.
+    """
+    return Greatest(
+        F('level'),
+        Case(
+            *(
+                When(
+                    GreaterThanOrEqual(experience, threshold),
+                    then=Value(level)
+                )
+                for level, threshold in reversed(
+                    list(enumerate(EXPERIENCE_CURVE, start=1))
+                )
+                if level > DEFAULT_SKILL_LEVEL
+            ),
+            default=Value(DEFAULT_SKILL_LEVEL),
+        ),
+        output_field=IntegerField()
+    )
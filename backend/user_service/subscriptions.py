@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+
+from .models import SlifeUser, Subscribe, count_subquery
+from .suggestions import forget_suggestions
+
+BULK_SUBSCRIBE_MAX_IDS = 500
+
+# Результаты subscribe_many для каждого id
+SUBSCRIBED = 'subscribed'
+ALREADY_SUBSCRIBED = 'already_subscribed'
+NOT_FOUND = 'not_found'
+SELF = 'self'
+
+
+@transaction.atomic
+def subscribe_many(user, author_ids):
+    """
+    Подписывает user на авторов author_ids одним INSERT и обновляет
+    счетчики подписок и флаг suggestions_stale одним UPDATE.
+    Сигналы post_save не отправляются, уведомления авторам
+    отправляет вызывающий код.
+    Возвращает словарь {id: результат} в порядке author_ids.
+    """
+    author_ids = list(dict.fromkeys(author_ids))
+    found = set(SlifeUser.objects.filter(
+        pk__in=author_ids
+    ).values_list('pk', flat=True))
+    subscribed = set(Subscribe.objects.filter(
+        user=user, subscribing_id__in=author_ids
+    ).values_list('subscribing_id', flat=True))
+    results = {}
+    for author_id in author_ids:
+        if author_id == user.pk:
+            results[author_id] = SELF
+        elif author_id not in found:
+            results[author_id] = NOT_FOUND
+        elif author_id in subscribed:
+            results[author_id] = ALREADY_SUBSCRIBED
+        else:
+            results[author_id] = SUBSCRIBED
+    created_ids = [
+        author_id for author_id, result in results.items()
+        if result == SUBSCRIBED
+    ]
+    if not created_ids:
+        return results
+    # Конфликты возможны только с параллельной подпиской на того же автора
+    Subscribe.objects.bulk_create(
+        [Subscribe(user=user, subscribing_id=pk) for pk in created_ids],
+        ignore_conflicts=True
+    )
+    # Счетчики пересчитываются, а не сдвигаются, поэтому остаются точными
+    # и для строк, пропущенных из-за конфликта
+    SlifeUser.objects.update_users(
+        [user.pk, *created_ids],
+        subscribers_count=Case(
+            When(pk=user.pk, then=count_subquery(Subscribe, 'user')),
+            default=F('subscribers_count'),
+            output_field=IntegerField()
+        ),
+        authors_count=Case(
+            When(
+                pk__in=created_ids,
+                then=count_subquery(Subscribe, 'subscribing')
+            ),
+            default=F('authors_count'),
+            output_field=IntegerField()
+        ),
+        suggestions_stale=True,
+    )
+    forget_suggestions(user.pk, created_ids)
+    return results
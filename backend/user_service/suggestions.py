@@ -0,0 +1,98 @@
+"""
+Рекомендации "возможно, вы знакомы" по графу подписок.
+
+Кандидаты пользователя - авторы, на которых подписаны его подписки,
+score - количество таких общих подписок. Для ограничения стоимости
+расчета учитывается случайная выборка из не более чем fan_out подписок
+пользователя, а сохраняются только limit лучших кандидатов.
+Изменение подписок помечает обоих участников флагом suggestions_stale,
+команда compute_suggestions пересчитывает только помеченных.
+"""
+import random
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+
+from .models import SlifeUser, Subscribe, UserSuggestion
+
+SUGGESTIONS_LIMIT = 50
+SUGGESTIONS_FAN_OUT = 100
+SUGGESTIONS_BATCH_SIZE = 500
+
+
+def forget_suggestions(user_id, candidate_ids):
+    """
+    Убирает из рекомендаций авторов, на которых пользователь подписался,
+    не дожидаясь пересчета. Флаг suggestions_stale выставляется
+    в UPDATE счетчиков подписок.
+    """
+    UserSuggestion.objects.filter(
+        user_id=user_id, candidate_id__in=candidate_ids
+    ).delete()
+
+
+def build_suggestions(user_id, limit=SUGGESTIONS_LIMIT,
+                      fan_out=SUGGESTIONS_FAN_OUT, rng=random):
+    """Возвращает [(candidate_id, score)] по убыванию score"""
+    following = list(Subscribe.objects.filter(
+        user_id=user_id
+    ).values_list('subscribing_id', flat=True))
+    if len(following) > fan_out:
+        following = rng.sample(following, fan_out)
+    if not following:
+        return []
+    # Второй шаг читает только индекс unique_subscription (user, subscribing)
+    return list(Subscribe.objects.filter(
+        user_id__in=following
+    ).exclude(subscribing_id=user_id).filter(~Exists(
+        Subscribe.objects.filter(
+            user_id=user_id, subscribing_id=OuterRef('subscribing_id')
+        )
+    )).values('subscribing_id').annotate(
+        score=Count('user_id')
+    ).order_by('-score', 'subscribing_id').values_list(
+        'subscribing_id', 'score'
+    )[:limit])
+
+
+def refresh_suggestions(user_ids, limit=SUGGESTIONS_LIMIT,
+                        fan_out=SUGGESTIONS_FAN_OUT, rng=random):
+    """
+    Пересчитывает рекомендации пользователей user_ids.
+    Флаг снимается до расчета: подписка, появившаяся во время расчета,
+    снова выставит его, и пользователь попадет в следующий запуск.
+    Возвращает количество сохраненных рекомендаций.
+    """
+    SlifeUser.objects.update_users(user_ids, suggestions_stale=False)
+    suggestions = [
+        UserSuggestion(user_id=user_id, candidate_id=candidate_id, score=score)
+        for user_id in user_ids
+        for candidate_id, score in build_suggestions(
+            user_id, limit, fan_out, rng
+        )
+    ]
+    with transaction.atomic():
+        UserSuggestion.objects.filter(user_id__in=user_ids).delete()
+        UserSuggestion.objects.bulk_create(suggestions)
+    return len(suggestions)
+
+
+def refresh_stale_suggestions(batch_size=SUGGESTIONS_BATCH_SIZE,
+                              limit=SUGGESTIONS_LIMIT,
+                              fan_out=SUGGESTIONS_FAN_OUT, rng=random):
+    """
+    Пересчитывает рекомендации помеченных пользователей пачками
+    по индексу user_suggestions_stale_idx.
+    Возвращает (количество пользователей, количество рекомендаций).
+    """
+    users = suggestions = 0
+    last_id = 0
+    while True:
+        user_ids = list(SlifeUser.objects.filter(
+            suggestions_stale=True, pk__gt=last_id
+        ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not user_ids:
+            return users, suggestions
+        suggestions += refresh_suggestions(user_ids, limit, fan_out, rng)
+        users += len(user_ids)
+        last_id = user_ids[-1]
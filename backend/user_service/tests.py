@@ -1,3 +1,448 @@
+import random
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .leaderboards import get_skill_rank, refresh_skill_ranks
+from .models import (
+    Skill, SlifeUser, Subscribe, UserSkills, UserSuggestion,
+    USERNAME_CANDIDATE_BATCHES, USERNAME_CREATE_ATTEMPTS
+)
+from .subscriptions import SUBSCRIBED, subscribe_many
+from .suggestions import build_suggestions
+
+# точка сохранения + пользователи + подписки + INSERT + UPDATE
+# + удаление рекомендаций + RELEASE
+BULK_SUBSCRIBE_QUERIES = 7
+# count + страница + навыки пользователей страницы
+USERS_PAGE_QUERIES = 3
+# страница + навыки пользователей страницы + справочник навыков
+USER_PROFILE_QUERIES = 3
+SUBSCRIPTIONS_PAGE_QUERIES = 3
+# навык + места с пользователями
+LEADERBOARD_TOP_QUERIES = 2
+# навык + место пользователя + соседи выше + соседи ниже
+LEADERBOARD_AROUND_QUERIES = 4
+
+
+class UserQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = SlifeUser.objects.create_user(
+            'viewer@slife.local', is_staff=True
+        )
+        skills = Skill.objects.bulk_create(
+            Skill(title=f'Навык {i}') for i in range(3)
+        )
+        for i in range(8):
+            other = SlifeUser.objects.create_user(f'other-{i}@slife.local')
+            Subscribe.objects.create(user=cls.user, subscribing=other)
+            Subscribe.objects.create(user=other, subscribing=cls.user)
+            UserSkills.objects.bulk_create(
+                UserSkills(
+                    user=other, skill=skill, level=i + 1, experience=0
+                )
+                for skill in skills
+            )
+        UserSkills.objects.create(
+            user=cls.user, skill=skills[0], level=2, experience=50
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertPageQueries(self, path, queries, results):
+        with self.assertNumQueries(queries):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), results)
+        return response
+
+    def test_users_page_has_fixed_query_budget(self):
+        self.assertPageQueries('/api/users/', USERS_PAGE_QUERIES, 9)
+
+    def test_me_has_fixed_query_budget(self):
+        with self.assertNumQueries(USER_PROFILE_QUERIES):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['subscribers_count'], 8)
+
+    def test_subscriptions_have_fixed_query_budget(self):
+        response = self.assertPageQueries(
+            '/api/users/subscriptions/', SUBSCRIPTIONS_PAGE_QUERIES, 8
+        )
+        self.assertTrue(all(
+            user['is_subscribed'] for user in response.data['results']
+        ))
+        self.assertPageQueries(
+            '/api/users/subscribers/', SUBSCRIPTIONS_PAGE_QUERIES, 8
+        )
+
+
+class FollowCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author, cls.other = (
+            SlifeUser.objects.create_user(f'{name}@slife.local')
+            for name in ('follower', 'author', 'other')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCountersMatch(self):
+        # recompute_follow_counters исправляет только разошедшиеся счетчики
+        self.assertEqual(SlifeUser.objects.recompute_follow_counters(), 0)
+
+    def counters(self, user):
+        user.refresh_from_db()
+        return user.subscribers_count, user.authors_count
+
+    def test_full_save_keeps_counters(self):
+        author = SlifeUser.objects.get(pk=self.author.pk)
+        Subscribe.objects.create(user=self.user, subscribing=self.author)
+        author.first_name = 'Автор'
+        author.save()
+        self.assertEqual(self.counters(author), (0, 1))
+        self.assertEqual(author.first_name, 'Автор')
+        author.authors_count = 5
+        author.save(update_fields=['authors_count'])
+        self.assertEqual(self.counters(author), (0, 5))
+
+    def test_subscribe_and_unsubscribe_shift_both_counters(self):
+        path = f'/api/users/{self.author.pk}/subscribe/'
+        self.assertEqual(self.client.post(path).status_code, 201)
+        self.assertEqual(self.counters(self.user), (1, 0))
+        self.assertEqual(self.counters(self.author), (0, 1))
+        self.assertCountersMatch()
+        self.assertEqual(self.client.post(path).status_code, 400)
+        self.assertEqual(self.counters(self.author), (0, 1))
+        self.assertEqual(self.client.delete(path).status_code, 204)
+        self.assertEqual(self.counters(self.user), (0, 0))
+        self.assertEqual(self.counters(self.author), (0, 0))
+        self.assertCountersMatch()
+
+    def test_counters_do_not_go_negative(self):
+        subscribe = Subscribe.objects.create(
+            user=self.user, subscribing=self.author
+        )
+        SlifeUser.objects.update(subscribers_count=0, authors_count=0)
+        subscribe.delete()
+        self.assertEqual(self.counters(self.user), (0, 0))
+        self.assertEqual(self.counters(self.author), (0, 0))
+
+    def test_deleting_user_updates_remaining_counters(self):
+        for user, author in (
+            (self.user, self.author), (self.author, self.user),
+            (self.other, self.author), (self.user, self.other),
+        ):
+            Subscribe.objects.create(user=user, subscribing=author)
+        self.author.delete()
+        self.assertEqual(self.counters(self.user), (1, 0))
+        self.assertEqual(self.counters(self.other), (0, 1))
+        self.assertCountersMatch()
+
+
+class GenerateUsernameTest(TestCase):
+    def take(self, *usernames):
+        SlifeUser.objects.bulk_create(
+            SlifeUser(username=username, email=f'{username}@slife.local')
+            for username in usernames
+        )
+
+    @mock.patch('user_service.models.USERNAME_SUFFIX_DIGITS', 1)
+    def test_taken_suffixes_are_skipped(self):
+        self.take('ivan', 'ivanov', *(f'ivan{i}' for i in range(4)))
+        for _ in range(20):
+            username = SlifeUser.objects.generate_username('ivan')
+            self.assertRegex(username, r'^ivan[4-9]$')
+
+    @mock.patch('user_service.models.USERNAME_SUFFIX_DIGITS', 1)
+    def test_suffix_grows_when_half_taken(self):
+        self.take(*(f'ivan{i}' for i in range(5)))
+        self.assertRegex(
+            SlifeUser.objects.generate_username('ivan'), r'^ivan\d{2}$'
+        )
+
+    @mock.patch('user_service.models.USERNAME_SUFFIX_DIGITS', 1)
+    @mock.patch('user_service.models.USERNAME_SUFFIX_MAX_DIGITS', 1)
+    def test_exhausted_suffixes_fall_back_to_uuid(self):
+        self.take(*(f'ivan{i}' for i in range(5)))
+        with mock.patch('uuid.uuid4', return_value=uuid.UUID('f' * 32)):
+            username = SlifeUser.objects.generate_username('ivan')
+        self.assertEqual(username, 'ivanf')
+
+    @mock.patch('user_service.models.USERNAME_SUFFIX_DIGITS', 1)
+    @mock.patch('user_service.models.USERNAME_SUFFIX_MAX_DIGITS', 1)
+    def test_sampling_is_bounded(self):
+        self.take('ivan0')
+        # Случайный суффикс всегда попадает в занятое имя
+        with mock.patch(
+            'user_service.models.random.randrange', return_value=0
+        ), self.assertNumQueries(1 + USERNAME_CANDIDATE_BATCHES):
+            username = SlifeUser.objects.generate_username('ivan')
+        self.assertRegex(username, r'^ivan[0-9a-f]$')
+
+    def test_create_user_retries_taken_username(self):
+        self.take('ivan0001')
+        with mock.patch.object(
+            SlifeUser.objects, 'generate_username',
+            side_effect=['ivan0001', 'ivan0002']
+        ) as generate_username:
+            user = SlifeUser.objects.create_user('ivan@slife.local')
+        self.assertEqual(user.username, 'ivan0002')
+        self.assertEqual(generate_username.call_count, 2)
+
+    def test_create_user_gives_up_after_attempts(self):
+        self.take('ivan0001')
+        with mock.patch.object(
+            SlifeUser.objects, 'generate_username', return_value='ivan0001'
+        ) as generate_username, self.assertRaises(IntegrityError):
+            SlifeUser.objects.create_user('ivan@slife.local')
+        self.assertEqual(
+            generate_username.call_count, USERNAME_CREATE_ATTEMPTS
+        )
+        self.assertFalse(
+            SlifeUser.objects.filter(email='ivan@slife.local').exists()
+        )
+
+
+class DefaultSkillsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = SlifeUser.objects.create_user('skills@slife.local')
+        cls.kindness, cls.sport = Skill.objects.bulk_create(
+            Skill(title=title) for title in ('Доброта', 'Спорт')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def skills(self):
+        response = self.client.get('/api/user-skills/')
+        self.assertEqual(response.status_code, 200)
+        return [
+            (skill['skill_title'], skill['level'], skill['experience'])
+            for skill in response.data['results']
+        ]
+
+    def test_missing_rows_read_as_defaults(self):
+        self.assertFalse(UserSkills.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            self.skills(), [('Доброта', 1, 0), ('Спорт', 1, 0)]
+        )
+
+    def test_compaction_removes_only_default_rows(self):
+        UserSkills.objects.bulk_create([
+            UserSkills(
+                user=self.user, skill=self.kindness, level=1, experience=0
+            ),
+            UserSkills(
+                user=self.user, skill=self.sport, level=2, experience=120
+            ),
+        ])
+        skills = self.skills()
+        call_command('compact_user_skills', chunk_size=1, stdout=StringIO())
+        self.assertEqual(
+            list(UserSkills.objects.filter(
+                user=self.user
+            ).values_list('skill', flat=True)),
+            [self.sport.pk]
+        )
+        self.assertEqual(self.skills(), skills)
+
+
+class SkillRankTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.skill = Skill.objects.create(title='Доброта')
+        cls.first, cls.tied, cls.third, cls.newcomer = (
+            SlifeUser.objects.create_user(f'{name}@slife.local')
+            for name in ('first', 'tied', 'third', 'newcomer')
+        )
+        for user, level, experience in (
+            (cls.first, 3, 300), (cls.tied, 3, 300), (cls.third, 2, 150)
+        ):
+            UserSkills.objects.create(
+                user=user, skill=cls.skill, level=level, experience=experience
+            )
+        refresh_skill_ranks(cls.skill.pk)
+
+    def rank(self, user):
+        return get_skill_rank(self.skill.pk, user).rank
+
+    def test_ties_share_rank(self):
+        self.assertEqual(
+            [self.rank(user) for user in (self.first, self.tied, self.third)],
+            [1, 1, 3]
+        )
+
+    def test_user_without_skill_row_ranks_last(self):
+        skill_rank = get_skill_rank(self.skill.pk, self.newcomer)
+        self.assertIsNone(skill_rank.pk)
+        self.assertEqual(
+            (skill_rank.rank, skill_rank.level, skill_rank.experience),
+            (4, 1, 0)
+        )
+
+    def test_user_missing_from_snapshot_is_placed_by_score(self):
+        user_skill = UserSkills.objects.create(
+            user=self.newcomer, skill=self.skill, level=3, experience=300
+        )
+        self.assertEqual(self.rank(self.newcomer), 1)
+        for experience, rank in ((200, 3), (150, 3), (100, 4)):
+            user_skill.level, user_skill.experience = 2, experience
+            user_skill.save()
+            self.assertEqual(self.rank(self.newcomer), rank)
+
+    def test_endpoints_have_fixed_query_budget(self):
+        client = APIClient()
+        client.force_authenticate(self.tied)
+        for path, queries in (
+            ('', LEADERBOARD_TOP_QUERIES),
+            ('around-me/', LEADERBOARD_AROUND_QUERIES),
+            ('friends/', LEADERBOARD_TOP_QUERIES),
+        ):
+            with self.assertNumQueries(queries):
+                response = client.get(
+                    f'/api/leaderboards/{self.skill.pk}/{path}'
+                )
+            self.assertEqual(response.status_code, 200)
+
+
+class BulkSubscribeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = SlifeUser.objects.create_user('importer@slife.local')
+        cls.authors = [
+            SlifeUser.objects.create_user(f'contact-{i}@slife.local')
+            for i in range(300)
+        ]
+        Subscribe.objects.create(user=cls.user, subscribing=cls.authors[0])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_contact_import_is_single_request(self):
+        ids = [author.pk for author in self.authors]
+        missing_id = ids[-1] + 1000
+        with self.assertNumQueries(BULK_SUBSCRIBE_QUERIES):
+            response = self.client.post(
+                '/api/users/bulk-subscribe/',
+                {'ids': [*ids, ids[1], self.user.pk, missing_id]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        results = {
+            result['id']: result['status']
+            for result in response.data['results']
+        }
+        self.assertEqual(len(response.data['results']), 302)
+        self.assertEqual(results[ids[0]], 'already_subscribed')
+        self.assertEqual(results[ids[1]], 'subscribed')
+        self.assertEqual(results[self.user.pk], 'self')
+        self.assertEqual(results[missing_id], 'not_found')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.subscribers_count, 300)
+        self.assertEqual(SlifeUser.objects.recompute_follow_counters(), 0)
+
+    def test_notifies_only_new_authors(self):
+        ids = [author.pk for author in self.authors[:3]]
+        with mock.patch('api.views.notify_new_subscriptions') as notify:
+            self.client.post(
+                '/api/users/bulk-subscribe/', {'ids': ids}, format='json'
+            )
+        notify.assert_called_once_with(self.user, ids[1:])
+
+    def test_counters_exact_on_concurrent_subscribe(self):
+        author = self.authors[0]
+        filter_subscriptions = Subscribe.objects.filter
+
+        def missing_subscriptions(*args, **kwargs):
+            # Подписка создана параллельно после чтения существующих
+            if 'subscribing_id__in' in kwargs:
+                return Subscribe.objects.none()
+            return filter_subscriptions(*args, **kwargs)
+
+        with mock.patch.object(
+            Subscribe.objects, 'filter', side_effect=missing_subscriptions
+        ):
+            results = subscribe_many(self.user, [author.pk])
+        self.assertEqual(results, {author.pk: SUBSCRIBED})
+        author.refresh_from_db()
+        self.assertEqual(author.authors_count, 1)
+        self.assertEqual(SlifeUser.objects.recompute_follow_counters(), 0)
+
+    def test_rejects_too_many_ids(self):
+        response = self.client.post(
+            '/api/users/bulk-subscribe/',
+            {'ids': list(range(1, 502))}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Subscribe.objects.filter(user=self.user).count(), 1)
+
+
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.friend, cls.colleague, cls.known, cls.mutual, cls.far = (
+            SlifeUser.objects.create_user(f'{name}@slife.local')
+            for name in (
+                'user', 'friend', 'colleague', 'known', 'mutual', 'far'
+            )
+        )
+        for user, author in (
+            (cls.user, cls.friend), (cls.user, cls.colleague),
+            (cls.user, cls.known),
+            (cls.friend, cls.mutual), (cls.colleague, cls.mutual),
+            (cls.friend, cls.known), (cls.friend, cls.user),
+            (cls.colleague, cls.far), (cls.mutual, cls.far),
+        ):
+            Subscribe.objects.create(user=user, subscribing=author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_suggestions_ranked_by_mutual_subscriptions(self):
+        call_command('compute_suggestions', stdout=StringIO())
+        response = self.client.get('/api/users/suggestions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(user['id'], user['mutual_count'])
+             for user in response.data['results']],
+            [(self.mutual.pk, 2), (self.far.pk, 1)]
+        )
+        self.assertFalse(
+            SlifeUser.objects.filter(suggestions_stale=True).exists()
+        )
+
+    def test_subscription_updates_suggestions_incrementally(self):
+        call_command('compute_suggestions', stdout=StringIO())
+        self.client.post(f'/api/users/{self.mutual.pk}/subscribe/')
+        self.assertFalse(UserSuggestion.objects.filter(
+            user=self.user, candidate=self.mutual
+        ).exists())
+        self.assertEqual(
+            set(SlifeUser.objects.filter(
+                suggestions_stale=True
+            ).values_list('pk', flat=True)),
+            {self.user.pk, self.mutual.pk}
+        )
 
-# Create your tests here.
+    def test_fan_out_limits_sampled_subscriptions(self):
+        suggestions = build_suggestions(
+            self.user.pk, fan_out=1, rng=random.Random(0)
+        )
+        # Из одной подписки у кандидата не больше одной общей
+        self.assertTrue(suggestions)
+        self.assertEqual({score for _, score in suggestions}, {1})